@@ -0,0 +1,288 @@
+"""
+HOW TO USE
+
+Newton_Raphson, Runge_Kutta의 속도, fn 계산 횟수, 메모리, logging/csv 비용을 측정해서 json으로 저장한다.
+Base_Method_ODE.calculate 등을 바꾼 후 이전 결과와 비교해서 느려지지 않았는지 확인한다.
+    사용 예시;
+    $ python benchmarks/run.py                                  # 모든 suite
+    $ python benchmarks/run.py --quick                          # 작은 iter_num만 (빠른 확인용)
+    $ python benchmarks/run.py --suite throughput memory        # 일부 suite만
+    $ python benchmarks/run.py --out new.json --compare old.json --tolerance 0.2
+
+    suite;
+        throughput : iter_num 크기별 steps/sec (print_interim = False, npy 저장)
+        fn_evals   : 한 번 계산할 때 fn이 호출된 횟수(calls)와 계산한 점의 개수(points)
+        memory     : tracemalloc으로 측정한 최대 메모리 (result를 memory에 두기 vs stream_chunk)
+        io         : print_interim, log_queue, output_format, stream_chunk에 따른 계산 시간
+        batch      : config 하나를 새 process에서 계산하는 시간(cold start)과 configs/ 전체를 순서대로/process pool로 계산하는 시간
+
+    --compare의 결과보다 tolerance 이상 나빠진 metric이 있으면 exit code 1로 끝난다.
+        (sec, peak_bytes는 작을수록, steps_per_sec은 클수록 좋은 값. calls, points는 같아야 한다.)
+    계산 log는 임시 폴더에 저장되고 지워진다. result cache는 사용하지 않는다.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(os.path.dirname(__file__))))
+from utils.config import Config
+from core.operate import operate
+from utils.metrics import count_points
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stderr, redirect_stdout
+import argparse
+import glob
+import json
+import math
+import platform
+import subprocess
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+A = math.pi*(11**2)**4 # constant of configs/newton_raphson.py
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Benchmark numerical methods.')
+    parser.add_argument('--suite', nargs='+', choices=list(SUITES), default=list(SUITES), help='suites to run (default: all)')
+    parser.add_argument('--quick', action='store_true', help='use small iter_num only')
+    parser.add_argument('--repeat', type=int, default=3, help='the best of "repeat" runs is reported (default: 3)')
+    parser.add_argument('--out', default=None, help='path of the json result (default: benchmarks/results/bench_<time>.json)')
+    parser.add_argument('--compare', default=None, help='json result of a previous run to compare with')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed relative regression for --compare (default: 0.2)')
+    args = parser.parse_args()
+    return args
+
+class CountingFn:
+    """
+    fn을 감싸서 호출 횟수(calls)와 계산한 점의 개수(points; 배열이면 원소 개수)를 센다.
+    """
+    def __init__(self, fn) -> None:
+        self.fn = fn
+        self.calls = 0
+        self.points = 0
+
+    def __call__(self, *args):
+        self.calls += 1
+        self.points += count_points(args)
+        return self.fn(*args)
+
+def make_calculator(case: str, iter_num: int = None, **options) -> dict:
+    """
+    benchmark에 사용할 calculator. iter_num이 None이면 stop_diff로 계산한다. (Runge_Kutta 제외)
+    """
+    lanes = np.linspace(500, 2000, 100)
+    calculators = {
+        'nr_scalar' : dict(type='Newton_Raphson', input=1000,
+                           fn=lambda x: 6411.2*math.pow(x/(60*A), 1.2727)*(0.5+0.1) - 1531.9 - 5.927*x + 0.0165*x*x),
+        'nr_dual' : dict(type='Newton_Raphson', input=1000,
+                         fn=lambda x: 6411.2*(x/(60*A))**1.2727*(0.5+0.1) - 1531.9 - 5.927*x + 0.0165*x*x),
+        'nr_dfn' : dict(type='Newton_Raphson', input=1000,
+                        fn=lambda x: 6411.2*(x/(60*A))**1.2727*(0.5+0.1) - 1531.9 - 5.927*x + 0.0165*x*x,
+                        dfn=lambda x: 6411.2*1.2727*(x/(60*A))**0.2727/(60*A)*(0.5+0.1) - 5.927 + 0.033*x),
+        'nr_batch' : dict(type='Newton_Raphson', input=lanes,
+                          fn=lambda x: 6411.2*(x/(60*A))**1.2727*(0.5+0.1) - 1531.9 - 5.927*x + 0.0165*x*x),
+        'rk_scalar' : dict(type='Runge_Kutta', input=dict(init_x=0, init_y=0, distance=1e-3), fn=lambda x, y: x + y),
+        'rk_system' : dict(type='Runge_Kutta', input=dict(init_x=0, init_y=[1, 0], distance=1e-3, system=True),
+                           fn=lambda x, y: np.array([y[1], -y[0]])),
+        'rk_batch' : dict(type='Runge_Kutta', input=dict(init_x=0, init_y=np.linspace(0, 1, 100), distance=1e-3),
+                          fn=lambda x, y: x + y),
+        'dormand_prince' : dict(type='Dormand_Prince', input=dict(init_x=0, init_y=0, end_x=1, rtol=1e-8, atol=1e-10),
+                                fn=lambda x, y: x + y),
+    }
+    cal = dict(calculators[case], print_interim=False, output_format='npy')
+    if iter_num is not None:
+        cal['iter_num'] = iter_num
+    elif cal['type'] == 'Newton_Raphson':
+        cal['stop_diff'] = 1e-10
+    cal.update(options)
+    return cal
+
+def run_once(cal: dict):
+    """
+    calculator 하나를 임시 폴더에서 계산한다. 화면 출력은 버린다.
+
+    Returns:
+        tuple of (method, sec)
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir, open(os.devnull, 'w') as devnull:
+        cfg = Config(dict(calculator=dict(cal, _dir=tmp_dir + '/')), cfg_text='')
+        with redirect_stdout(devnull), redirect_stderr(devnull): # stream handlers are made in operate
+            start = time.perf_counter()
+            method = operate(cfg, use_cache=False)
+            sec = time.perf_counter() - start
+    return method, sec
+
+def best_sec(cal: dict, repeat: int) -> float:
+    return min(run_once(cal)[1] for _ in range(repeat))
+
+def record(suite: str, case: str, params: dict, **metrics) -> dict:
+    row = dict(suite=suite, case=case, params=params, metrics=metrics)
+    print(f'{suite:>10} | {case:<16} | {json.dumps(params):<48} | '
+          + ', '.join(f'{k}={v:.6g}' if isinstance(v, float) else f'{k}={v}' for k, v in metrics.items()))
+    return row
+
+def suite_throughput(args) -> list:
+    sizes = [1000, 10000] if args.quick else [1000, 10000, 100000]
+    rows = []
+    for case in ('nr_scalar', 'nr_batch', 'rk_scalar', 'rk_system', 'rk_batch'):
+        for iter_num in sizes:
+            sec = best_sec(make_calculator(case, iter_num), args.repeat)
+            rows.append(record('throughput', case, dict(iter_num=iter_num), sec=sec, steps_per_sec=iter_num/sec))
+    return rows
+
+def suite_fn_evals(args) -> list:
+    rows = []
+    for case in ('nr_scalar', 'nr_dual', 'nr_dfn', 'nr_batch', 'rk_scalar', 'rk_system', 'dormand_prince'):
+        iter_num = 100 if case.startswith('rk') else None
+        cal = make_calculator(case, iter_num)
+        cal['fn'] = fn = CountingFn(cal['fn'])
+        method, _ = run_once(cal)
+        iterations = len(method.result) - 1 if not getattr(method, 'is_batch', False) else int(method.iteration.max())
+        params = dict(iter_num=iter_num) if iter_num else dict(stop_diff=cal['stop_diff']) if 'stop_diff' in cal else {}
+        derivative = getattr(method, 'derivative', None)
+        if derivative:
+            params['derivative'] = derivative
+        rows.append(record('fn_evals', case, params, iterations=iterations, calls=fn.calls, points=fn.points))
+    return rows
+
+def suite_memory(args) -> list:
+    iter_num = 20000 if args.quick else 200000
+    rows = []
+    for case in ('rk_scalar', 'rk_system'):
+        for options in (dict(), dict(stream_chunk=1000)):
+            tracemalloc.start()
+            run_once(make_calculator(case, iter_num, **options))
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            rows.append(record('memory', case, dict(iter_num=iter_num, **options), peak_bytes=peak, bytes_per_row=peak/(iter_num+1)))
+    return rows
+
+def suite_io(args) -> list:
+    iter_num = 2000 if args.quick else 20000
+    options = [
+        dict(),
+        dict(output_format='csv'),
+        dict(output_format='csv', stream_chunk=1000),
+        dict(output_format=['csv', 'npy']),
+        dict(print_interim=True),
+        dict(print_interim=True, log_queue=True),
+        dict(print_interim=True, output_format='csv'),
+    ]
+    rows = []
+    for case in ('nr_scalar', 'rk_scalar'):
+        base = None
+        for option in options:
+            sec = best_sec(make_calculator(case, iter_num, **option), args.repeat)
+            base = sec if base is None else base
+            rows.append(record('io', case, dict(iter_num=iter_num, **option), sec=sec, overhead_sec=sec - base))
+    return rows
+
+def _cold_start_sec(config_path: str) -> float:
+    """
+    새 python process에서 config를 읽고 계산하는 시간. (import 포함)
+    """
+    script = ('import sys, tempfile, time; start = time.perf_counter(); sys.path.insert(0, sys.argv[1]);'
+              'from utils.config import Config; from core.operate import operate;'
+              'cfg = Config.fromfile(sys.argv[2]); d = tempfile.mkdtemp(); cfg.calculator._dir = d + "/";'
+              'operate(cfg, use_cache=False); print(time.perf_counter() - start)')
+    out = subprocess.run([sys.executable, '-c', script, ROOT, config_path], capture_output=True, text=True, check=True)
+    return float(out.stdout.strip().splitlines()[-1])
+
+def suite_batch(args) -> list:
+    from tools.batch import run_config
+    rows = []
+    config_path = os.path.join(ROOT, 'configs', 'newton_raphson.py')
+    wall = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        inner = _cold_start_sec(config_path)
+        wall.append((time.perf_counter() - start, inner))
+    rows.append(record('batch', 'single_cold', dict(config='configs/newton_raphson.py'), sec=min(w for w, _ in wall), in_process_sec=min(i for _, i in wall)))
+
+    # every variant of configs/*.py except jit configs (compile time of numba is not a concern here)
+    runs = []
+    for path in sorted(glob.glob(os.path.join(ROOT, 'configs', '*.py'))):
+        if 'jit' in os.path.basename(path):
+            continue
+        runs.extend((path, variant) for variant in range(Config.fromfile(path).n_variants()))
+    workers = os.cpu_count()
+    with tempfile.TemporaryDirectory() as tmp_dir, open(os.devnull, 'w') as devnull:
+        with redirect_stdout(devnull), redirect_stderr(devnull):
+            start = time.perf_counter()
+            statuses = [run_config(path, f'{tmp_dir}/seq_{i:04d}/', variant, use_cache=False)['status'] for i, (path, variant) in enumerate(runs)]
+            sequential = time.perf_counter() - start
+            failed = sum(status != 'done' for status in statuses)
+
+            start = time.perf_counter()
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = [executor.submit(run_config, path, f'{tmp_dir}/pool_{i:04d}/', variant, False) for i, (path, variant) in enumerate(runs)]
+                statuses = [future.result()['status'] for future in futures]
+            pool = time.perf_counter() - start
+    rows.append(record('batch', 'configs_sequential', dict(runs=len(runs)), sec=sequential, runs_per_sec=len(runs)/sequential, failed=failed))
+    rows.append(record('batch', 'configs_pool', dict(runs=len(runs), workers=workers), sec=pool, runs_per_sec=len(runs)/pool,
+                       failed=sum(status != 'done' for status in statuses)))
+    return rows
+
+SUITES = dict(throughput=suite_throughput, fn_evals=suite_fn_evals, memory=suite_memory, io=suite_io, batch=suite_batch)
+
+# direction of each metric for --compare; 1 if larger is better, -1 if smaller is better, 0 if it should be the same
+METRIC_DIRECTION = dict(sec=-1, steps_per_sec=1, runs_per_sec=1, peak_bytes=-1, calls=0, points=0, iterations=0, failed=0)
+
+def compare(results: list, baseline_path: str, tolerance: float) -> list:
+    """
+    같은 (suite, case, params)의 metric을 비교해서 tolerance 이상 나빠진 항목을 반환한다.
+    """
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = {(r['suite'], r['case'], json.dumps(r['params'], sort_keys=True)): r['metrics'] for r in json.load(f)['results']}
+    regressions = []
+    for r in results:
+        old = baseline.get((r['suite'], r['case'], json.dumps(r['params'], sort_keys=True)))
+        if old is None:
+            continue
+        for name, direction in METRIC_DIRECTION.items():
+            if name not in r['metrics'] or name not in old:
+                continue
+            new_value, old_value = r['metrics'][name], old[name]
+            if direction == 0:
+                worse = new_value != old_value
+            elif direction > 0:
+                worse = new_value < old_value * (1 - tolerance)
+            else:
+                worse = new_value > old_value * (1 + tolerance)
+            if worse:
+                regressions.append(f"{r['suite']}/{r['case']} {json.dumps(r['params'])}: {name} {old_value:.6g} -> {new_value:.6g}")
+    return regressions
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    args = parse_args()
+    assert args.repeat > 0, '"--repeat" should be a positive integer.'
+    results = []
+    for name in args.suite:
+        results.extend(SUITES[name](args))
+
+    meta = dict(time=time.strftime('%Y-%m-%d %H:%M:%S'), commit=git_commit(), python=platform.python_version(),
+                numpy=np.__version__, platform=platform.platform(), cpu_count=os.cpu_count(), quick=args.quick, repeat=args.repeat)
+    out = args.out or os.path.join(ROOT, 'benchmarks', 'results', time.strftime('bench_%y%m%d_%H%M%S.json'))
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, 'w', encoding='utf-8') as f:
+        json.dump(dict(meta=meta, results=results), f, indent=2)
+    print(f'{len(results)} results -> {out}')
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.tolerance)
+        for line in regressions:
+            print(f'REGRESSION {line}')
+        print(f'{len(regressions)} regressions (tolerance {args.tolerance:.0%}) compared with {args.compare}')
+        if regressions:
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
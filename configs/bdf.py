@@ -0,0 +1,11 @@
+# Robertson's chemical kinetics. stiff; the rate constants differ by 10^9
+import numpy as np
+
+calculator = dict(
+    fn = lambda x, y: np.array([-0.04*y[0] + 1e4*y[1]*y[2],
+                                0.04*y[0] - 1e4*y[1]*y[2] - 3e7*y[1]**2,
+                                3e7*y[1]**2]),
+    input = dict(init_x = 0, init_y = [1, 0, 0], end_x = 40, rtol = 1e-4, atol = 1e-8),
+    type = 'BDF',
+    print_interim = False,
+            )
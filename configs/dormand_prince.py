@@ -0,0 +1,6 @@
+calculator = dict(
+    fn = lambda x, y: x + y,
+    input = dict(init_x = 0, init_y = 0, end_x = 1, rtol = 1e-6, atol = 1e-9),
+    type = 'Dormand_Prince',
+    print_interim = True,
+            )
@@ -0,0 +1,7 @@
+calculator = dict(
+    fn = 'sin(x) - 0.1*x',
+    input = dict(a = -20, b = 20, resolution = 400),
+    type = 'Multi_Root',
+    stop_diff = 0.0000000001,
+    print_interim = True,
+              )
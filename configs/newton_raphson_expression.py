@@ -0,0 +1,13 @@
+calculator = dict(
+    fn = '6411.2*(x/(60*A))**1.2727*(0.5+0.1) - B - 5.927*x + 0.0165*x*x',
+    constants = dict(A = 3.141592653589793*(11**2)**4, B = 1531.9),
+    input = [500, 1000, 2000],
+    type = 'Newton_Raphson',
+    stop_diff = 0.0000001,
+    print_interim = False,
+              )
+
+sweep = dict(
+    mode = 'product',
+    params = {'B' : [1000, 1531.9, 2000]},
+            )
@@ -0,0 +1,11 @@
+# Broyden's tridiagonal function. the Jacobian is calculated by 3 column groups for any n
+import numpy as np
+n = 100
+
+calculator = dict(
+    fn = lambda x: (3 - 2*x)*x - np.concatenate((np.zeros_like(x[:1]), x[:-1])) - 2*np.concatenate((x[1:], np.zeros_like(x[:1]))) + 1,
+    input = dict(init_x = -np.ones(n), sparsity = np.eye(n) + np.eye(n, k=1) + np.eye(n, k=-1), broyden = True),
+    type = 'Newton_System',
+    stop_diff = 1e-10,
+    print_interim = False,
+            )
@@ -0,0 +1,7 @@
+calculator = dict(
+    fn = lambda x, y: x + y,
+    input = dict(init_x = 0, init_y = [0, 0, 1], distance = [0.2, 0.1, 0.2]),
+    type = 'Runge_Kutta',
+    iter_num = 5,
+    print_interim = True,
+            )
@@ -0,0 +1,9 @@
+# interrupted run can be continued; $ python tools/main.py --resume logs/Runge_Kutta_.../
+calculator = dict(
+    fn = lambda x, y: x + y,
+    input = dict(init_x = 0, init_y = 0, distance=0.00001),
+    type = 'Runge_Kutta',
+    iter_num = 100000,
+    print_interim = False,
+    checkpoint = 10000,
+            )
@@ -0,0 +1,9 @@
+# y between the grid points; method.dense(x) or DenseOutput.load(_dir + 'dense_output.npz')(x)
+calculator = dict(
+    fn = lambda x, y: x + y,
+    input = dict(init_x = 0, init_y = 0, distance=0.2),
+    type = 'Runge_Kutta',
+    iter_num = 5,
+    print_interim = True,
+    dense_output = True,
+            )
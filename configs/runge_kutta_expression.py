@@ -0,0 +1,8 @@
+calculator = dict(
+    fn = '[y[1], -w*w*y[0]]',
+    constants = dict(w = 1.0),
+    input = dict(init_x = 0, init_y = [1, 0], distance = 0.1, system = True),
+    type = 'Runge_Kutta',
+    iter_num = 10,
+    print_interim = True,
+            )
@@ -0,0 +1,9 @@
+calculator = dict(
+    fn = lambda x, y: x + y,
+    input = dict(init_x = 0, init_y = 0, distance = 0.00001),
+    type = 'Runge_Kutta',
+    iter_num = 100000,
+    print_interim = False,
+    output_format = 'npy',
+    jit = True, # needs numba. (see core/methods/ode/jit.py)
+            )
@@ -0,0 +1,9 @@
+import numpy as np
+
+calculator = dict(
+    fn = lambda x, y: np.array([y[1], -y[0]]),
+    input = dict(init_x = 0, init_y = [1, 0], distance = 0.1, system = True),
+    type = 'Runge_Kutta',
+    iter_num = 10,
+    print_interim = True,
+            )
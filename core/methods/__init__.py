@@ -1 +1 @@
-from .ode import *
+from . import ode
@@ -3,23 +3,59 @@ import sys, os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(os.path.dirname(__file__)))))
 from utils.config import ConfigDict
 from utils.logging_custom import *
-import pandas as pd
+from utils.trajectory import TrajectoryBuffer
+from utils.metrics import RunMetrics
+import time
 
 class Base_Method(metaclass = ABCMeta) :
 
+    version = 1 # increase when the result of the method is changed. (key of utils/result_cache.py)
+
     def __init__(self, inputs: ConfigDict) -> None:
         """
         Args:
             inputs : ConfigDict. There are fn, iter_num, stop_diff, print_interim, init_val, ...
-                fn : lambda expression.
+                fn : lambda expression, or expression string such as 'x + y'. (see core/methods/ode/expression.py)
+                constants : dict (optional). constants used in the expression string of "fn".
                 iter_num : positive integer. Use either iter_num or stop_diff.
                 stop_diff : zero or positive float. Use either iter_num or stop_diff.
                 print_interim : boolean
+                log_queue : boolean (optional). If True, interim logs are written by a background thread.
+                    The calculation does not wait for a slow disk or console. It is not faster otherwise (the GIL is shared).
+                output_format : str or list of str (optional). csv(default), npy, npz, parquet, feather
+                stream_chunk : positive integer (optional). If set, results are written to the file every "stream_chunk" rows. (csv, npy only)
+                jit : boolean (optional). If True, fn and the iteration loop are compiled by numba if possible. (see core/methods/ode/jit.py)
+                metrics : boolean (optional). If True, time of each phase and counters are saved in metrics.json. (see utils/metrics.py)
+                checkpoint : positive integer (optional). The state is saved every "checkpoint" iterations to resume the run. (see utils/checkpoint.py)
                 init_val : differ according to each method.
         """
         self._sanity_check(inputs)
         self._set_logger(inputs)
-        self.calculate(inputs)
+        self.metrics = RunMetrics() if inputs.get('metrics', False) else None
+        try:
+            start = time.perf_counter()
+            self.calculate(inputs)
+            if self.metrics is not None:
+                self.metrics.total_sec = time.perf_counter() - start
+                self.metrics.counters.update(self.metrics_counters())
+                self.metrics.save(inputs._dir + 'metrics.json', self.__class__.__name__)
+        finally:
+            self.close_logger()
+
+    @property
+    def df(self):
+        """
+        self.result를 처음 사용할 때 한 번만 DataFrame으로 변환한다.
+        """
+        if getattr(self, '_df', None) is None:
+            self._df = self.result.to_dataframe()
+        return self._df
+
+    def metrics_counters(self) -> dict:
+        """
+        metrics.json의 counters에 더할 method마다의 값. (e.g. accepted step 개수) 필요하면 override한다.
+        """
+        return {}
 
     def _sanity_check(self, inputs: ConfigDict) -> None:
         """Check sanity if needed."""
@@ -34,16 +70,34 @@ class Base_Method(metaclass = ABCMeta) :
         """
         _dir = inputs._dir
 
-        logger_interim = CustomLogger('logger_interim')
+        logger_interim = CustomLogger('logger_interim', use_queue=inputs.get('log_queue', False))
+        logger_interim.close() # drop handlers left by a previous run in this process
         logger_interim.add_stream_handler(level='INFO')
-        logger_interim.add_file_handler(level='INFO', filename=_dir+'log_interim.txt')
+        # continue the interim log of the interrupted run when it is resumed
+        logger_interim.add_file_handler(level='INFO', filename=_dir+'log_interim.txt', mode='a' if inputs.get('_resume', False) else 'w')
 
         logger_result = CustomLogger('logger_result')
+        logger_result.close()
         logger_result.add_stream_handler(level='INFO')
         logger_result.add_file_handler(level='INFO', filename=_dir+'log_result.txt')
 
+        self.custom_logger_interim = logger_interim
+        self.custom_logger_result = logger_result
         self.logger_interim = logger_interim.get_logger()
-        self.logger_result = logger_result.get_logger()     
+        self.logger_result = logger_result.get_logger()
+
+    def flush_interim_log(self) -> None:
+        """
+        interim log를 모두 출력한다. result log보다 먼저 출력되도록 log_result 전에 호출한다.
+        """
+        self.custom_logger_interim.flush()
+
+    def close_logger(self) -> None:
+        """
+        이번 계산의 handler를 닫는다. (파일도 닫힌다.) 계산이 끝나면 __init__에서 호출된다.
+        """
+        self.custom_logger_interim.close()
+        self.custom_logger_result.close()     
 
     @abstractmethod
     def calculate(self, inputs: ConfigDict) -> None:
@@ -77,7 +131,7 @@ class Base_Method(metaclass = ABCMeta) :
     def save_init_val_for_csv(self, val) -> None:
         """
         Save the initial value to create csv result file.
-        use pandas with self.df
+        use TrajectoryBuffer with self.result
 
         Args:
             val : return type of _change_format for each method
@@ -87,36 +141,21 @@ class Base_Method(metaclass = ABCMeta) :
         
         Example:
         ==========================================================
-            # make dict for series of each variables
-            var0 = {
-                0: val[0]
-            }
-            var1 = {
-                0: val[1]
-            }
-            ...
-
-            # make Series
-            var0 = pd.Series(var0)
-            var1 = pd.Series(var1)
-            ...
-
-            # make DataFrame
-            self.df = pd.DataFrame({
-                'var0' : var0,
-                'var1' : var1,
-                ...
-            })
+            # make TrajectoryBuffer with the name of each variables
+            self.result = TrajectoryBuffer(['var0', 'var1', ...])
+
+            # save the initial value as index 0
+            self.result.append(0, [val[0], val[1], ...])
         ==========================================================
         """
         pass
 
     def save_val_for_csv(self, idx:int, val:list) -> None:
         """
-        If "val" is not list, this method must be modified by overriding.
+        If "val" can not be stored as a row of self.result, this method must be modified by overriding.
 
         Save values to create csv result file.
-        use pandas with self.result
+        use TrajectoryBuffer with self.result
 
         Args:
             idx : index for Data Frame
@@ -125,8 +164,21 @@ class Base_Method(metaclass = ABCMeta) :
         Returns:
             There's no any return.
         """
-        # add next index series to self.df
-        self.df.loc[idx] = val
+        # add next row to self.result (amortized O(1))
+        self.result.append(idx, val)
+
+    def save_result_for_csv(self, val) -> None:
+        """
+        Save the final value to create csv result file.
+        Override this only when the method stores a summary of the result instead of every iteration.
+
+        Args:
+            val : value of result. The type is from "_change_format" method for each method
+
+        Returns:
+            There's no any return.
+        """
+        pass
 
     @abstractmethod
     def _calculate_helper(self, fn, val):
@@ -1,4 +1,26 @@
-from .newton_raphson import Newton_Raphson
-from .runge_kutta import Runge_Kutta
+from importlib import import_module
+from ...builder import METHODS
 
-__all__ = ['Newton_Raphson', 'Runge_Kutta',]
\ No newline at end of file
+# each method module is imported when it is built. (see utils/storage.py)
+# the module should store the class under the same name. otherwise METHODS.get raises AssertionError.
+_METHOD_MODULES = {
+    'Newton_Raphson' : 'newton_raphson',
+    'Runge_Kutta' : 'runge_kutta',
+    'Dormand_Prince' : 'dormand_prince',
+    'Secant' : 'secant',
+    'Brent' : 'brent',
+    'Illinois' : 'illinois',
+    'Multi_Root' : 'multi_root',
+    'BDF' : 'bdf',
+    'Newton_System' : 'newton_system',
+}
+for _name, _module in _METHOD_MODULES.items():
+    METHODS.store_lazy_module(_name, f'{__name__}.{_module}')
+
+__all__ = list(_METHOD_MODULES)
+
+def __getattr__(name):
+    # from core.methods.ode import Newton_Raphson
+    if name in _METHOD_MODULES:
+        return getattr(import_module(f'{__name__}.{_METHOD_MODULES[name]}'), name)
+    raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
@@ -0,0 +1,113 @@
+from .base_method_ode import Base_Method_ODE
+from utils.trajectory import TrajectoryBuffer
+import numpy as np
+
+class Base_Adaptive_ODE(Base_Method_ODE):
+    """
+    step size를 바꾸면서 x가 "end_x"에 도달할 때까지 계산하는 ODE method들의 base. (Dormand_Prince, BDF)
+
+    "iter_num"과 "stop_diff"는 사용하지 않는다. "distance"는 처음 step size이다. (없으면 _initial_step으로 정한다.)
+    "init_y"가 list이면 system of ODEs이고 fn은 ndarray를 반환해야 한다.
+    result.csv의 한 행은 [x, y_0, y_1, ..., step_columns]이다.
+    step size가 x에서 구별할 수 없을 만큼 작아지면 (e.g. 해가 발산) _stop_small_step으로 멈춘다.
+
+    subclass에서 구현하기;
+        step_columns : y 뒤의 column 이름들 (e.g. ('h', 'order'))
+        initial_step_order : _initial_step이 가정하는 method의 차수
+        _change_format : _make_record로 record를 만들고 rtol, atol, h와 method의 상태를 정한다.
+        _calculate_helper : step 하나. record를 반환한다.
+    """
+    fn_variables = ('x', 'y')
+    max_iter = 100000
+    step_columns = ()
+    initial_step_order = 1
+
+    def _sanity_check(self, inputs) -> None:
+        is_iter = inputs.get('iter_num') is not None
+        is_stop_diff = inputs.get('stop_diff') is not None
+        assert not (is_iter or is_stop_diff), f'"iter_num" and "stop_diff" are not supported for {self.__class__.__name__}. Use "end_x".'
+
+    def _make_record(self, val) -> np.ndarray:
+        """
+        end_x, y의 모양은 상수니까 속성으로 남기고 step 개수 등을 세기 시작한다.
+        [x, y_0, y_1, ..., step_columns] 모양의 ndarray를 내보낸다. (step_columns의 마지막은 1)
+        """
+        self.end_x = float(val.end_x)
+        assert self.end_x > val.init_x, '"end_x" should be larger than "init_x".'
+        self.is_scalar = not isinstance(val.init_y, (list, tuple, np.ndarray))
+        init_y = np.asarray(val.init_y, dtype=np.float64).ravel()
+        self.dim = init_y.shape[0]
+        record = np.zeros(1 + self.dim + len(self.step_columns), dtype=np.float64)
+        record[0] = val.init_x
+        record[1:1+self.dim] = init_y
+        record[-1] = 1
+
+        self.n_accepted = 0
+        self.n_rejected = 0
+        self.n_fn_eval = 0
+        self.failed = False
+        return record
+
+    def _vector_fn(self, fn):
+        """
+        scalar ODE이면 y를 길이 1인 ndarray로 다루도록 fn을 감싼다.
+        """
+        if not self.is_scalar:
+            return fn
+        return lambda x, y: np.atleast_1d(fn(x, y[0]))
+
+    def _initial_step(self, fn, x, y, f0) -> float:
+        """
+        Hairer, Norsett, Wanner, "Solving Ordinary Differential Equations I", II.4 (order = initial_step_order)
+        """
+        scale = self.atol + self.rtol * np.abs(y)
+        d0 = np.sqrt(np.mean((y / scale)**2))
+        d1 = np.sqrt(np.mean((f0 / scale)**2))
+        h0 = 1e-6 if d0 < 1e-5 or d1 < 1e-5 else 0.01 * d0 / d1
+        h0 = min(h0, self.end_x - x)
+        f1 = fn(x + h0, y + h0 * f0)
+        self.n_fn_eval += 1
+        d2 = np.sqrt(np.mean(((f1 - f0) / scale)**2)) / h0
+        if max(d1, d2) <= 1e-15:
+            h1 = max(1e-6, h0 * 1e-3)
+        else:
+            h1 = (0.01 / max(d1, d2))**(1 / (self.initial_step_order + 1))
+        return min(100 * h0, h1, self.end_x - x)
+
+    def _min_step(self, x) -> float:
+        """
+        x에서 구별할 수 있는 가장 작은 step size. (x 근처 float 간격의 10배)
+        """
+        return 10 * abs(np.nextafter(x, np.inf) - x)
+
+    def _stop_small_step(self, x) -> None:
+        self.failed = True
+        self.logger_interim.warning(f'Step size is too small at x = {x}. {self.__class__.__name__} is stopped.')
+
+    def _is_not_converged(self, val: np.ndarray, pre_val: np.ndarray, stop_diff) -> bool:
+        """
+        x가 end_x에 도달할 때까지 계속한다.
+        """
+        return val[0] < self.end_x and not self.failed
+
+    def _convergence_value(self, record: np.ndarray) -> np.ndarray:
+        return record[1:1+self.dim]
+
+    def save_init_val_for_csv(self, val: np.ndarray) -> None:
+        y_columns = ['y'] if self.is_scalar else [f'y_{i}' for i in range(self.dim)]
+        self.result = TrajectoryBuffer(['x'] + y_columns + list(self.step_columns))
+        self.result.append(0, val)
+
+    def _format_y(self, y: np.ndarray) -> str:
+        if self.is_scalar:
+            return f"{y[0]:6.6f}"
+        return np.array2string(y, precision=6)
+
+    def _step_summary(self) -> str:
+        """
+        log_result에서 결과 뒤에 적는 step과 fn 계산 횟수.
+        """
+        return f"{self.n_accepted} accepted, {self.n_rejected} rejected steps, {self.n_fn_eval} fn evaluations"
+
+    def log_result(self, val: np.ndarray) -> None:
+        self.logger_result.info(f"Result : y = {self._format_y(val[1:1+self.dim])} when x = {val[0]:6.3f} ({self._step_summary()})")
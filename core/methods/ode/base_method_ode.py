@@ -1,10 +1,25 @@
 from ..base_method import Base_Method
+from .dual_number import Dual
+from .expression import Expression
+from . import jit
 import sys, os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(os.path.dirname(__file__))))))
 from utils.config import ConfigDict
+from utils.trajectory import check_output_format
+from utils import checkpoint as ckpt
+import numpy as np
+import time
 
 class Base_Method_ODE(Base_Method) :
 
+    max_iter = 10000 # upper bound of iterations for "stop_diff"
+    fn_variables = ('x',) # argument names of "fn" when it is an expression string
+    # attributes which are not saved in a checkpoint. (functions are not saved either. they are set again by _prepare_fn)
+    checkpoint_excluded = ('custom_logger_interim', 'custom_logger_result', 'logger_interim', 'logger_result',
+                           'metrics', '_df', '_resumed')
+    # TrajectoryBuffer attributes saved incrementally in checkpoint_<name>.npy (only the rows since the last checkpoint)
+    checkpoint_buffers = ('result',)
+
     def cal_centered_divided_difference(self, fn, x:float, dx:float = 1e-5) -> float:
         """
         미분을 대신할 중앙차분법.
@@ -15,46 +30,286 @@ class Base_Method_ODE(Base_Method) :
         dfn = (fn(x+dx)-fn(x-dx)) / (2*dx)
         return dfn
 
+    def cal_dual_derivative(self, fn, x):
+        """
+        dual number로 fn을 한 번만 계산해서 fn(x)와 미분값을 함께 구한다.
+
+        Returns:
+            tuple of fn(x) and fn'(x)
+        """
+        out = fn(Dual(x, np.ones_like(x) if isinstance(x, np.ndarray) else 1.0))
+        if not isinstance(out, Dual): # constant
+            return out, 0.0 * x
+        return out.val, out.der
+
+    def supports_dual(self, fn, x) -> bool:
+        """
+        fn이 dual number로 계산될 수 있는지 확인한다. (math 모듈 함수를 쓰면 TypeError가 발생한다.)
+        batch의 "x > 0 if ..."처럼 배열의 비교를 bool로 쓰면 ValueError가 발생하는 등 어떤 에러든 발생하면
+        dual number를 사용하지 않는다. (vectorize_fn과 centered divided difference로 계산)
+        """
+        try:
+            out = fn(Dual(x, np.ones_like(x) if isinstance(x, np.ndarray) else 1.0))
+        except Exception:
+            return False
+        return isinstance(out, Dual)
+
+    @staticmethod
+    def vectorize_fn(fn, *args):
+        """
+        fn이 NumPy 배열을 그대로 계산할 수 있으면 fn을, 아니면 np.vectorize로 감싼 fn을 반환한다.
+        (math.pow처럼 scalar만 받는 함수는 TypeError가 발생한다.)
+        np.vectorize로 감싼 경우 한 원소의 math domain error 등은 nan으로 바꿔서 다른 원소의 계산은 계속한다.
+
+        Args:
+            fn : lambda expression
+            args : fn에 넣어볼 NumPy 배열들
+        """
+        def scalar_fn(*scalar_args):
+            try:
+                return fn(*scalar_args)
+            except (ValueError, ZeroDivisionError, OverflowError):
+                return np.nan
+
+        try:
+            out = fn(*args)
+        except (TypeError, ValueError):
+            return np.vectorize(scalar_fn, otypes=[np.float64])
+        if np.shape(out) != np.broadcast(*args).shape:
+            return np.vectorize(scalar_fn, otypes=[np.float64])
+        return fn
+
+    def compile_fn(self, fn, inputs: ConfigDict):
+        """
+        "fn"이 문자열이면 "constants"와 함께 Expression으로 compile한다. (lambda는 그대로 반환)
+        """
+        if isinstance(fn, str):
+            return Expression(fn, self.fn_variables, inputs.get('constants'))
+        return fn
+
+    def _prepare_fn(self, fn, val):
+        """
+        계산 전에 fn을 method에 맞게 바꿀 때 override한다. (e.g. batch 계산을 위한 vectorize)
+
+        Args:
+            fn : lambda expression
+            val : return type of _change_format for each method
+        """
+        return fn
+
+    def _jit_calculate(self, fn, val, iter_num: int, stop_diff):
+        """
+        "jit"이 True일 때 override한다. numba kernel로 계산한 1번째부터 마지막 iteration까지의 값을
+        result의 행 모양 ((iteration 개수, column 개수) ndarray)으로 반환한다. (core/methods/ode/jit.py 참고)
+        지원하지 않는 입력이면 None을 반환한다.
+
+        Args:
+            iter_num : number of iterations to calculate at most. (with "stop_diff", less if it converges)
+                With "stream_chunk", it is called again from the last value for every "stream_chunk" iterations.
+            stop_diff : None if "iter_num" is used
+        """
+        return None
+
+    def _row_to_val(self, row: np.ndarray):
+        """
+        result의 한 행을 _calculate_helper가 반환하는 형식으로 바꾼다. (jit 계산 후 log에 사용)
+        """
+        return row
+
+    def _convergence_value(self, val):
+        """
+        "metrics"의 convergence를 계산할 값. val에 수렴과 관계없는 값이 있으면 override한다.
+        """
+        return val
+
+    def _try_jit(self, fn, val, iter_num: int, stop_diff):
+        """
+        numba가 없거나 compile할 수 없으면 경고를 남기고 None을 반환한다. (원래 방법으로 계산)
+        """
+        name = self.__class__.__name__
+        if not jit.is_available():
+            self.logger_interim.warning(f'numba is not installed. {name} is calculated without "jit". ($ pip install numba)')
+            return None
+        try:
+            rows = self._jit_calculate(fn, val, iter_num, stop_diff)
+        except jit.errors() as e:
+            self.logger_interim.warning(f'"fn" can not be compiled by numba. {name} is calculated without "jit". ({type(e).__name__})')
+            return None
+        if rows is None:
+            self.logger_interim.warning(f'"jit" is not supported for this input of {name}. It is calculated without "jit".')
+        return rows
+
+    def _set_logger(self, inputs: ConfigDict) -> None:
+        """
+        이어서 계산할 때는 checkpoint를 읽고 log_interim.txt를 checkpoint 때의 크기로 자른 후 logger를 만든다.
+        """
+        self._resumed = None
+        if inputs.get('_resume', False):
+            self._resumed = ckpt.load_checkpoint(inputs._dir)
+            name = self.__class__.__name__
+            assert self._resumed['method'] == name, f'The checkpoint in {inputs._dir} is of {self._resumed["method"]}, not {name}.'
+            ckpt.truncate_file(inputs._dir + 'log_interim.txt', self._resumed['log_interim'])
+        super()._set_logger(inputs)
+
+    def checkpoint_state(self) -> dict:
+        """
+        checkpoint에 저장할 method의 상태. 함수와 checkpoint_excluded를 뺀 속성들이다.
+        (e.g. Newton_Raphson batch의 active, Dormand_Prince의 h)
+        """
+        excluded = self.checkpoint_excluded + self.checkpoint_buffers
+        return {k: v for k, v in vars(self).items() if k not in excluded and not callable(v)}
+
+    def _checkpoint_buffers(self) -> dict:
+        """
+        {name: TrajectoryBuffer} of checkpoint_buffers which are made. (e.g. batch Newton_Raphson has no result until the end)
+        """
+        return {name: getattr(self, name) for name in self.checkpoint_buffers if getattr(self, name, None) is not None}
+
+    def _save_checkpoint(self, _dir: str, cnt: int, val, pre_val=None) -> None:
+        """
+        log를 모두 쓴 후 지금까지의 result (checkpoint_buffers)와 loop의 상태를 저장한다.
+        """
+        self.flush_interim_log()
+        ckpt.save_checkpoint(_dir, dict(
+            method=self.__class__.__name__,
+            cnt=cnt,
+            val=val,
+            pre_val=pre_val,
+            state=self.checkpoint_state(),
+            buffers={name: buffer.snapshot(_dir + ckpt.buffer_file(name)) for name, buffer in self._checkpoint_buffers().items()},
+            log_interim=os.path.getsize(_dir + 'log_interim.txt'),
+        ))
+
+    def _is_not_converged(self, val, pre_val, stop_diff: float) -> bool:
+        """
+        "stop_diff"로 계산할 때 반복을 계속할지 판단한다.
+        val이 scalar가 아니면 override한다.
+        """
+        return abs(val - pre_val) > stop_diff
+
     def calculate(self, inputs: ConfigDict) -> None:
 
-        fn = inputs.fn
+        start = time.perf_counter()
+        output_formats = check_output_format(inputs.get('output_format', 'csv'))
         init_val = self._change_format(inputs.input)
             # input = {init_x : 10, init_y : 10, ...}
+        fn = self.compile_fn(inputs.fn, inputs)
+        metrics = self.metrics
+        if metrics is not None:
+            fn = metrics.counted_fn(fn)
+        fn = self._prepare_fn(fn, init_val)
         self.save_init_val_for_csv(init_val)
+        resumed, self._resumed = self._resumed, None
+        stream_chunk = inputs.get('stream_chunk')
+        if resumed is not None:
+            # continue from the checkpoint. rows saved after the checkpoint are dropped.
+            vars(self).update(resumed['state'])
+            buffers = self._checkpoint_buffers()
+            for name, snapshot in resumed['buffers'].items():
+                buffers[name].restore(snapshot, inputs._dir + ckpt.buffer_file(name))
+        elif stream_chunk is not None and hasattr(self, 'result'):
+            # write every "stream_chunk" rows to the result file. memory is bounded.
+            self.result.stream_to(inputs._dir + 'result', output_formats, stream_chunk)
         iter_num = inputs.get('iter_num', -1)
         stop_diff = inputs.get('stop_diff')
         print_interim = inputs.print_interim
+        checkpoint = inputs.get('checkpoint')
+        if metrics is not None:
+            metrics.add('prepare', time.perf_counter() - start)
+
+        # methods used in the loop. they are timed only when "metrics" is True.
+        calculate_helper, log_interim, save_val_for_csv = self._calculate_helper, self.log_interim, self.save_val_for_csv
+        is_not_converged, save_checkpoint = self._is_not_converged, self._save_checkpoint
+        try_jit, jit_calculate = self._try_jit, self._jit_calculate
+        if metrics is not None:
+            calculate_helper = metrics.tracked_helper(calculate_helper, self._convergence_value)
+            log_interim = metrics.timed('log_interim', log_interim)
+            save_val_for_csv = metrics.timed('save_val_for_csv', save_val_for_csv)
+            is_not_converged = metrics.timed('is_not_converged', is_not_converged)
+            save_checkpoint = metrics.timed('checkpoint', save_checkpoint)
+            try_jit, jit_calculate = metrics.timed('jit', try_jit), metrics.timed('jit', jit_calculate)
+
+        # the number of iterations of the next numba kernel call. "stream_chunk" iterations at a time to bound the memory.
+        total_num = iter_num if iter_num != -1 else self.max_iter
+        def jit_num(cnt: int) -> int:
+            return total_num - cnt if stream_chunk is None else min(stream_chunk, total_num - cnt)
+
+        rows = None
+        if inputs.get('jit', False) and resumed is None:
+            rows = try_jit(fn, init_val, jit_num(0), stop_diff)
+
+        # calculated by numba. log and save every row, and continue from the last value if rows are left.
+        if rows is not None:
+            val, cnt = init_val, 0
+            log_interim(val, cnt, print_interim)
+            while True:
+                if print_interim:
+                    for i, row in enumerate(rows, cnt + 1):
+                        log_interim(self._row_to_val(row), i, print_interim)
+                self.result.extend(np.arange(cnt + 1, cnt + rows.shape[0] + 1), rows)
+                pre_val = val if rows.shape[0] == 1 else self._row_to_val(rows[-2])
+                val = self._row_to_val(rows[-1])
+                cnt += rows.shape[0]
+                if cnt == total_num or (iter_num == -1 and not self._is_not_converged(val, pre_val, stop_diff)):
+                    break
+                rows = jit_calculate(fn, val, jit_num(cnt), stop_diff)
+            if iter_num == -1 and cnt == self.max_iter:
+                self.logger_interim.warning(f'Calculate up to {self.max_iter:,} times. (max_iter of {self.__class__.__name__})')
 
         # calculate by iteration 
-        if iter_num != -1:
-            cnt = 0
-            val = init_val
-            self.log_interim(val, cnt, print_interim)
-            for _ in range(iter_num):
-                val = self._calculate_helper(fn, val)
+        elif iter_num != -1:
+            if resumed is None:
+                cnt = 0
+                val = init_val
+                log_interim(val, cnt, print_interim)
+            else:
+                cnt, val = resumed['cnt'], resumed['val']
+            for _ in range(cnt, iter_num):
+                val = calculate_helper(fn, val)
                 cnt += 1
-                self.log_interim(val, cnt, print_interim)
-                self.save_val_for_csv(cnt, val)
+                log_interim(val, cnt, print_interim)
+                save_val_for_csv(cnt, val)
+                if checkpoint is not None and cnt % checkpoint == 0:
+                    save_checkpoint(inputs._dir, cnt, val)
         
         # calculate by difference of last two values
         else:
-            cnt = 0
-            pre_val = init_val
-            self.log_interim(pre_val, cnt, print_interim)
-            val = self._calculate_helper(fn, pre_val)
-            cnt += 1
-            self.log_interim(val, cnt, print_interim)
-            self.save_val_for_csv(cnt, val)
-            while abs(val - pre_val) > stop_diff:
+            if resumed is None:
+                cnt = 0
+                pre_val = init_val
+                log_interim(pre_val, cnt, print_interim)
+                val = calculate_helper(fn, pre_val)
+                cnt += 1
+                log_interim(val, cnt, print_interim)
+                save_val_for_csv(cnt, val)
+            else:
+                cnt, val, pre_val = resumed['cnt'], resumed['val'], resumed['pre_val']
+            while is_not_converged(val, pre_val, stop_diff):
                 pre_val = val
-                val = self._calculate_helper(fn, pre_val)
+                val = calculate_helper(fn, pre_val)
                 cnt += 1
-                self.log_interim(val, cnt, print_interim)
-                self.save_val_for_csv(cnt, val)
-                if cnt == 10000:
-                    self.logger_interim.warning('For "stop_diff", calculate up to 10,000 times.')
+                log_interim(val, cnt, print_interim)
+                save_val_for_csv(cnt, val)
+                if cnt == self.max_iter:
+                    self.logger_interim.warning(f'Calculate up to {self.max_iter:,} times. (max_iter of {self.__class__.__name__})')
                     break
+                if checkpoint is not None and cnt % checkpoint == 0:
+                    save_checkpoint(inputs._dir, cnt, val, pre_val)
                 
+        start = time.perf_counter()
+        for buffer in self._checkpoint_buffers().values():
+            buffer.close_snapshot()
+        self.flush_interim_log()
         self.log_result(val)
+        self.save_result_for_csv(val)
 
-        self.df.to_csv(inputs._dir + 'result.csv', encoding='utf-8')
\ No newline at end of file
+        if self.result.is_streaming:
+            self.result.close()
+        else:
+            for fmt in output_formats:
+                self.result.save(inputs._dir + 'result', fmt=fmt)
+        if checkpoint is not None or resumed is not None:
+            ckpt.remove_checkpoint(inputs._dir)
+        if metrics is not None:
+            metrics.counters['iterations'] = cnt
+            metrics.add('save', time.perf_counter() - start)
\ No newline at end of file
@@ -0,0 +1,56 @@
+from .base_method_ode import Base_Method_ODE
+from abc import abstractmethod
+from utils.trajectory import TrajectoryBuffer
+import numpy as np
+
+class Base_Root_Finder(Base_Method_ODE):
+    """
+    미분 없이 fn(x) = 0의 근을 찾는 method들의 base. (Secant, Brent, Illinois)
+
+    "stop_diff"는 x의 허용 오차로 사용한다. (없으면 2e-12)
+        "iter_num"으로 계산하면 수렴한 후에는 fn을 더 계산하지 않고 같은 값을 저장한다.
+    result.csv의 column은 "columns"이고 앞의 두 개는 x, fn이다.
+    fn을 계산한 횟수는 self.n_fn_eval에 세고 log_result와 metrics.json에 남긴다.
+
+    subclass에서 구현하기;
+        _change_format : input에서 record([x, fn, ...] ndarray)를 만든다. (fn은 _init_state에서 계산)
+        _init_state : 처음 fn 계산. fn(x)로 record를 채운다.
+        _calculate_helper : 한 iteration. record를 반환한다.
+    """
+    columns = ('x', 'fn')
+
+    def _sanity_check(self, inputs) -> None:
+        stop_diff = inputs.get('stop_diff')
+        self.xtol = 2e-12 if stop_diff is None else stop_diff
+        self.n_fn_eval = 0
+
+    def _prepare_fn(self, fn, val):
+        self._init_state(fn, val)
+        return fn
+
+    @abstractmethod
+    def _init_state(self, fn, record: np.ndarray) -> None:
+        """
+        처음 fn을 계산해서 record와 method의 상태를 채운다. (n_fn_eval도 센다.)
+        """
+        pass
+
+    def save_init_val_for_csv(self, val: np.ndarray) -> None:
+        self.result = TrajectoryBuffer(list(self.columns))
+        self.result.append(0, val)
+
+    def _is_not_converged(self, val: np.ndarray, pre_val: np.ndarray, stop_diff) -> bool:
+        """
+        fn이 0이거나 x가 "stop_diff"보다 적게 바뀌면 멈춘다.
+        """
+        return val[1] != 0 and abs(val[0] - pre_val[0]) > self.xtol
+
+    def metrics_counters(self) -> dict:
+        return dict(fn_evaluations=self.n_fn_eval)
+
+    def log_result(self, val: np.ndarray) -> None:
+        self.logger_result.info(f"Result : {val[0]:6.6f} (fn = {val[1]:.3e}, {self.n_fn_eval} fn evaluations)")
+
+    def log_interim(self, val_interim: np.ndarray, cnt: int, print_interim: bool) -> None:
+        if print_interim:
+            self.logger_interim.info(f"The value of {cnt:>5}th iteration : {val_interim[0]:6.6f} (fn = {val_interim[1]:.3e})")
@@ -0,0 +1,269 @@
+from .base_adaptive_ode import Base_Adaptive_ODE
+from ...builder import METHODS
+import numpy as np
+
+EPS = np.finfo(np.float64).eps
+
+@METHODS.store_module('BDF')
+class BDF(Base_Adaptive_ODE):
+    """
+    Implicit variable order (1 ~ 5), variable step size BDF method for stiff ODEs.
+    (numerical differentiation formulas of Shampine and Reichelt, "The MATLAB ODE Suite", the same scheme as scipy.integrate.BDF)
+
+    Every step solves the implicit equation by Newton iterations with the iteration matrix I - c*J. (c = h / alpha)
+        J (Jacobian of fn by y) is calculated by "dfn" or centered divided difference, and kept while Newton converges.
+        The inverse of I - c*J is kept too, and calculated again only when the step size or order is changed.
+        If Newton does not converge, J is calculated again at the current value. If it still does not converge, h is halved.
+    So J is calculated only a few times even for thousands of steps.
+
+    example of config file;
+    ================================================================================
+        import numpy as np
+
+        calculator = dict(
+        fn = lambda x, y: np.array([-0.04*y[0] + 1e4*y[1]*y[2],
+                                    0.04*y[0] - 1e4*y[1]*y[2] - 3e7*y[1]**2,
+                                    3e7*y[1]**2]),
+        input = dict(init_x = 0, init_y = [1, 0, 0], end_x = 40, rtol = 1e-4, atol = 1e-8),
+        type = 'BDF',
+        print_interim = True,
+                )
+    ================================================================================
+
+    "iter_num" and "stop_diff" are not used. "distance" is the initial step size (optional).
+    "dfn" (optional) : lambda x, y: Jacobian matrix (dim, dim) of fn. If it is not given, centered divided difference is used.
+    Every accepted step is saved in result.csv;
+        x, y (or y_0, y_1, ...) : value after the step
+        h : step size
+        order : order of the BDF formula used for the step
+    """
+    step_columns = ('h', 'order')
+    initial_step_order = 1
+
+    MAX_ORDER = 5
+    NEWTON_MAXITER = 4
+    FACTOR_MIN = 0.2
+    FACTOR_MAX = 10.0
+
+    # coefficients of NDF. (kappa = 0 is BDF)
+    KAPPA = np.array([0, -0.1850, -1/9, -0.0823, -0.0415, 0])
+    GAMMA = np.hstack((0, np.cumsum(1 / np.arange(1, MAX_ORDER + 1))))
+    ALPHA = (1 - KAPPA) * GAMMA
+    ERROR_CONST = KAPPA * GAMMA + 1 / np.arange(1, MAX_ORDER + 2)
+
+    def _sanity_check(self, inputs) -> None:
+        super()._sanity_check(inputs)
+        self.dfn = self.compile_fn(inputs.get('dfn'), inputs)
+
+    def _change_format(self, val) -> np.ndarray:
+        """
+        rtol, atol은 상수니까 속성으로 남긴다.
+        [x, y_0, y_1, ..., h, order] 모양의 ndarray를 내보낸다. (result.csv의 한 행)
+        """
+        record = self._make_record(val)
+        self.rtol = max(float(val.get('rtol', 1e-3)), 100 * EPS)
+        self.atol = float(val.get('atol', 1e-6))
+        assert self.atol >= 0, '"atol" should not be negative.'
+        self.h = val.get('distance')
+        self.newton_tol = max(10 * EPS / self.rtol, min(0.03, self.rtol ** 0.5))
+
+        self.order = 1
+        self.n_equal_steps = 0
+        self.n_jac_eval = 0
+        self.n_factorization = 0
+        return record
+
+    def _prepare_fn(self, fn, val):
+        fn = self._vector_fn(fn)
+        if self.dfn is not None and self.is_scalar:
+            scalar_dfn = self.dfn
+            self._dfn = lambda x, y: np.atleast_2d(scalar_dfn(x, y[0]))
+        elif self.dfn is not None:
+            self._dfn = lambda x, y: np.asarray(self.dfn(x, y), dtype=np.float64).reshape(self.dim, self.dim)
+        x, y = val[0], val[1:1+self.dim]
+        f = fn(x, y)
+        self.n_fn_eval += 1
+        if self.h is None:
+            self.h = self._initial_step(fn, x, y, f)
+
+        # D[i] : i-th backward difference of y (scaled by h^i). Nordsieck-like history of the quasi-constant step method
+        self.D = np.zeros((self.MAX_ORDER + 3, self.dim), dtype=np.float64)
+        self.D[0] = y
+        self.D[1] = f * self.h
+        self.J = self._jacobian(fn, x, y)
+        self.J_is_current = True
+        self.inv_iteration_matrix = None # inverse of I - c*J. None if it should be calculated again
+        return fn
+
+    def _jacobian(self, fn, x, y) -> np.ndarray:
+        """
+        "dfn"이 없으면 column마다 centered divided difference로 계산한다. (fn을 2*dim번 계산)
+        dx는 centered difference의 오차가 가장 작은 eps^(1/3) 정도로 y의 크기에 맞춘다.
+        """
+        self.n_jac_eval += 1
+        if self.dfn is not None:
+            return self._dfn(x, y)
+        J = np.empty((self.dim, self.dim), dtype=np.float64)
+        dx = EPS**(1/3) * np.maximum(np.abs(y), max(self.atol / self.rtol, EPS**(1/3)))
+        e = np.zeros(self.dim, dtype=np.float64)
+        for j in range(self.dim):
+            e[j] = 1.0
+            J[:, j] = self.cal_centered_divided_difference(lambda s: fn(x, y + s*e), 0.0, dx[j])
+            e[j] = 0.0
+        self.n_fn_eval += 2 * self.dim
+        return J
+
+    def _rms(self, v: np.ndarray) -> float:
+        return float(np.sqrt(np.mean(v * v)))
+
+    def _compute_R(self, order: int, factor: float) -> np.ndarray:
+        I = np.arange(1, order + 1)[:, None]
+        J = np.arange(1, order + 1)
+        M = np.zeros((order + 1, order + 1))
+        M[1:, 1:] = (I - 1 - factor * J) / I
+        M[0] = 1
+        return np.cumprod(M, axis=0)
+
+    def _change_D(self, factor: float) -> None:
+        """
+        step size를 factor배로 바꿀 때 backward difference들을 새 step size에 맞게 바꾼다.
+        """
+        order = self.order
+        RU = self._compute_R(order, factor).dot(self._compute_R(order, 1))
+        self.D[:order+1] = RU.T.dot(self.D[:order+1])
+        self.n_equal_steps = 0
+
+    def _solve_bdf_system(self, fn, x_new, y_predict, c, psi, scale):
+        """
+        y = y_predict + d에서 d - c*fn(x_new, y) + psi = 0을 simplified Newton iteration으로 푼다.
+        수렴 속도(rate)로 NEWTON_MAXITER 안에 수렴하지 못할 것 같으면 일찍 멈춘다.
+
+        Returns:
+            (converged, number of iterations, y, d)
+        """
+        d = 0
+        y = y_predict.copy()
+        dy_norm_old = None
+        converged = False
+        for k in range(self.NEWTON_MAXITER):
+            f = fn(x_new, y)
+            self.n_fn_eval += 1
+            if not np.all(np.isfinite(f)):
+                break
+            dy = self.inv_iteration_matrix.dot(c * f - psi - d)
+            dy_norm = self._rms(dy / scale)
+            rate = None if dy_norm_old is None else dy_norm / dy_norm_old
+            if rate is not None and (rate >= 1 or rate**(self.NEWTON_MAXITER - k) / (1 - rate) * dy_norm > self.newton_tol):
+                break
+            y += dy
+            d += dy
+            if dy_norm == 0 or (rate is not None and rate / (1 - rate) * dy_norm < self.newton_tol):
+                converged = True
+                break
+            dy_norm_old = dy_norm
+        return converged, k + 1, y, d
+
+    def _calculate_helper(self, fn, record: np.ndarray) -> np.ndarray:
+        """
+        step 하나를 accept할 때까지 시도한다. (error가 크거나 Newton이 수렴하지 않으면 h를 줄여서 다시 시도)
+        accept한 후 차수(order - 1, order, order + 1)마다의 error로 다음 order와 step size를 정한다.
+        """
+        x = record[0]
+        D = self.D
+        min_step = self._min_step(x)
+        if self.h < min_step:
+            self._change_D(min_step / self.h)
+            self.h = min_step
+        order = self.order
+        alpha, gamma, error_const = self.ALPHA, self.GAMMA, self.ERROR_CONST
+
+        while True:
+            if self.h < min_step:
+                self._stop_small_step(x)
+                return record
+            x_new = x + self.h
+            if x_new >= self.end_x:
+                x_new = self.end_x
+                self._change_D((x_new - x) / self.h)
+                self.inv_iteration_matrix = None
+            h = x_new - x
+            self.h = h
+
+            y_predict = np.sum(D[:order+1], axis=0)
+            scale = self.atol + self.rtol * np.abs(y_predict)
+            psi = D[1:order+1].T.dot(gamma[1:order+1]) / alpha[order]
+            c = h / alpha[order]
+
+            converged = False
+            while not converged:
+                if self.inv_iteration_matrix is None:
+                    self.inv_iteration_matrix = np.linalg.inv(np.eye(self.dim) - c * self.J)
+                    self.n_factorization += 1
+                converged, n_iter, y_new, d = self._solve_bdf_system(fn, x_new, y_predict, c, psi, scale)
+                if not converged:
+                    if self.J_is_current:
+                        break
+                    # Newton is slow with the old J. calculate J again at the current value
+                    self.J = self._jacobian(fn, x_new, y_predict)
+                    self.J_is_current = True
+                    self.inv_iteration_matrix = None
+
+            if not converged:
+                self.n_rejected += 1
+                self.h *= 0.5
+                self._change_D(0.5)
+                self.inv_iteration_matrix = None
+                continue
+
+            safety = 0.9 * (2*self.NEWTON_MAXITER + 1) / (2*self.NEWTON_MAXITER + n_iter)
+            scale = self.atol + self.rtol * np.abs(y_new)
+            error_norm = self._rms(error_const[order] * d / scale)
+            if error_norm > 1:
+                # I - c*J with the old c is still good enough for Newton. it is calculated again only if Newton fails
+                self.n_rejected += 1
+                factor = max(self.FACTOR_MIN, safety * error_norm**(-1/(order + 1)))
+                self.h *= factor
+                self._change_D(factor)
+                continue
+            break
+
+        self.n_accepted += 1
+        self.n_equal_steps += 1
+        self.J_is_current = False
+        D[order+2] = d - D[order+1]
+        D[order+1] = d
+        for i in reversed(range(order + 1)):
+            D[i] += D[i+1]
+
+        record = record.copy()
+        record[0] = x_new
+        record[1:1+self.dim] = y_new
+        record[-2] = h
+        record[-1] = order
+        if self.n_equal_steps < order + 1:
+            return record
+
+        # change order and step size after order + 1 steps of the same size
+        error_m_norm = self._rms(error_const[order-1] * D[order] / scale) if order > 1 else np.inf
+        error_p_norm = self._rms(error_const[order+1] * D[order+2] / scale) if order < self.MAX_ORDER else np.inf
+        error_norms = np.array([error_m_norm, error_norm, error_p_norm])
+        with np.errstate(divide='ignore'):
+            factors = error_norms ** (-1 / np.arange(order, order + 3))
+        self.order = order + int(np.argmax(factors)) - 1
+        factor = min(self.FACTOR_MAX, safety * np.max(factors))
+        self.h *= factor
+        self._change_D(factor)
+        self.inv_iteration_matrix = None
+        return record
+
+    def metrics_counters(self) -> dict:
+        return dict(accepted_steps=self.n_accepted, rejected_steps=self.n_rejected, fn_evaluations=self.n_fn_eval,
+                    jacobian_evaluations=self.n_jac_eval, factorizations=self.n_factorization)
+
+    def _step_summary(self) -> str:
+        return f"{super()._step_summary()}, {self.n_jac_eval} jacobians, {self.n_factorization} factorizations"
+
+    def log_interim(self, val_interim: np.ndarray, cnt: int, print_interim: bool) -> None:
+        if print_interim:
+            self.logger_interim.info(f"The value of {cnt:>5}th step : y = {self._format_y(val_interim[1:1+self.dim])} when x = {val_interim[0]:6.3f} "
+                                     f"(h = {val_interim[-2]:.3e}, order {int(val_interim[-1])})")
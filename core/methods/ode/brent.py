@@ -0,0 +1,100 @@
+from .base_root_finder import Base_Root_Finder
+from ...builder import METHODS
+import numpy as np
+
+@METHODS.store_module('Brent')
+class Brent(Base_Root_Finder):
+    """
+    Brent's method. (inverse quadratic interpolation / secant / bisection)
+    bracket [a, b] 안에서 보간이 충분히 줄어들지 않으면 bisection을 하므로 항상 수렴하고,
+    보통은 secant 정도로 빠르다. iteration마다 fn을 한 번 계산한다.
+    example of config file;
+    ================================================================================
+        calculator = dict(
+            fn = lambda x: x*x - 2,
+            input = dict(a = 0, b = 2),
+            type = 'Brent',
+            stop_diff = 1e-10,
+            print_interim = True,
+                    )
+    ================================================================================
+
+    fn(a)와 fn(b)의 부호가 달라야 한다.
+    bracket의 반 폭이 (stop_diff + 4*eps*|x|)/2 보다 작아지면 멈춘다. (scipy.optimize.brentq와 같은 기준)
+    result.csv; x, fn, a, b (a, b는 지금의 bracket)
+    """
+    columns = ('x', 'fn', 'a', 'b')
+    rtol = 4 * np.finfo(float).eps
+
+    def _change_format(self, val) -> np.ndarray:
+        """
+        x_pre, x_cur, x_blk (bracket의 다른 끝)와 그 fn 값, 직전 step 크기(s_pre, s_cur)는 속성으로 남긴다.
+        """
+        a, b = float(val['a']), float(val['b'])
+        assert a != b, '"a" and "b" should be different.'
+        self.x_pre, self.x_cur = a, b
+        self.x_blk = self.f_blk = 0.0
+        self.s_pre = self.s_cur = 0.0
+        self.converged = False
+        return np.array([b, np.nan, min(a, b), max(a, b)])
+
+    def _init_state(self, fn, record: np.ndarray) -> None:
+        self.f_pre, self.f_cur = fn(self.x_pre), fn(self.x_cur)
+        self.n_fn_eval += 2
+        assert self.f_pre * self.f_cur <= 0, f'"fn(a)" and "fn(b)" should have opposite signs. (fn(a) = {self.f_pre}, fn(b) = {self.f_cur})'
+        if self.f_pre == 0:
+            self.x_cur, self.f_cur = self.x_pre, self.f_pre
+        self._update_bracket()
+        record[:] = self._record()
+
+    def _update_bracket(self) -> None:
+        """
+        x_cur과 부호가 다른 끝을 x_blk로 두고, |fn|이 작은 쪽을 x_cur로 만든다. 수렴했는지 확인한다.
+        """
+        if self.f_pre != 0 and self.f_cur != 0 and np.signbit(self.f_pre) != np.signbit(self.f_cur):
+            self.x_blk, self.f_blk = self.x_pre, self.f_pre
+            self.s_pre = self.s_cur = self.x_cur - self.x_pre
+        if abs(self.f_blk) < abs(self.f_cur):
+            self.x_pre, self.x_cur, self.x_blk = self.x_cur, self.x_blk, self.x_cur
+            self.f_pre, self.f_cur, self.f_blk = self.f_cur, self.f_blk, self.f_cur
+        self.delta = (self.xtol + self.rtol*abs(self.x_cur)) / 2
+        self.s_bis = (self.x_blk - self.x_cur) / 2
+        self.converged = self.f_cur == 0 or abs(self.s_bis) < self.delta
+
+    def _record(self) -> np.ndarray:
+        x_blk = self.x_cur if self.f_cur == 0 else self.x_blk
+        return np.array([self.x_cur, self.f_cur, min(self.x_cur, x_blk), max(self.x_cur, x_blk)])
+
+    def _calculate_helper(self, fn, record: np.ndarray) -> np.ndarray:
+        if self.converged:
+            return record
+        delta, s_bis = self.delta, self.s_bis
+        x_pre, x_cur, x_blk = self.x_pre, self.x_cur, self.x_blk
+        f_pre, f_cur, f_blk = self.f_pre, self.f_cur, self.f_blk
+
+        if abs(self.s_pre) > delta and abs(f_cur) < abs(f_pre):
+            if x_pre == x_blk: # secant (interpolate)
+                s_try = -f_cur*(x_cur - x_pre)/(f_cur - f_pre)
+            else: # inverse quadratic interpolation (extrapolate)
+                d_pre = (f_pre - f_cur)/(x_pre - x_cur)
+                d_blk = (f_blk - f_cur)/(x_blk - x_cur)
+                s_try = -f_cur*(f_blk*d_blk - f_pre*d_pre)/(d_blk*d_pre*(f_blk - f_pre))
+            if 2*abs(s_try) < min(abs(self.s_pre), 3*abs(s_bis) - delta): # accept interpolation
+                self.s_pre, self.s_cur = self.s_cur, s_try
+            else: # bisection
+                self.s_pre = self.s_cur = s_bis
+        else: # bisection
+            self.s_pre = self.s_cur = s_bis
+
+        self.x_pre, self.f_pre = x_cur, f_cur
+        if abs(self.s_cur) > delta:
+            self.x_cur = x_cur + self.s_cur
+        else:
+            self.x_cur = x_cur + (delta if s_bis > 0 else -delta)
+        self.f_cur = fn(self.x_cur)
+        self.n_fn_eval += 1
+        self._update_bracket()
+        return self._record()
+
+    def _is_not_converged(self, val: np.ndarray, pre_val: np.ndarray, stop_diff) -> bool:
+        return not self.converged
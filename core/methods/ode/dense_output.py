@@ -0,0 +1,107 @@
+import numpy as np
+
+class DenseOutput:
+    """
+    Runge_Kutta의 step마다 저장한 stage(k1, k2, k3, k4)로 grid 사이의 y를 계산한다. (fn을 다시 계산하지 않는다.)
+
+    RK4의 continuous extension (3rd order, Hairer, Norsett, Wanner, "Solving Ordinary Differential Equations I", II.6);
+        y(x_n + theta*h) = y_n + b1(theta)*k1 + b2(theta)*(k2 + k3) + b4(theta)*k4     (k_i = h * fn(...))
+            b1 = theta - 3/2 theta^2 + 2/3 theta^3
+            b2 = b3 = theta^2 - 2/3 theta^3
+            b4 = -1/2 theta^2 + 2/3 theta^3
+        theta = 0이면 y_n, theta = 1이면 RK4의 y_n+1과 같으므로 grid 위에서는 result.csv의 값과 같다.
+
+    example;
+    ================================================================================
+        method = operate(cfg) # Runge_Kutta with dense_output = True
+        y = method.dense(np.linspace(0, 1, 1001)) # one vectorized call
+
+        dense = DenseOutput.load(_dir + 'dense_output.npz') # later, from the log directory
+        y = dense([0.15, 0.35])
+    ================================================================================
+
+    shape of the values;
+        x : (step 개수, lane 개수)
+        y : (step 개수, lane 개수, dim) : step을 시작할 때의 값
+        k : (step 개수, 4, lane 개수, dim)
+        mode : 'scalar', 'batch' (lane마다 x grid가 다르다), 'system' (y가 vector)
+    """
+
+    def __init__(self, x: np.ndarray, y: np.ndarray, k: np.ndarray, h: np.ndarray, mode: str) -> None:
+        assert x.shape[0] > 0, 'There is no step for dense output.'
+        self.x, self.y, self.k = x, y, k
+        self.h = np.broadcast_to(np.asarray(h, dtype=np.float64), (x.shape[1],))
+        self.mode = mode
+
+    @classmethod
+    def from_stages(cls, stages: np.ndarray, h, n_lanes: int, dim: int, mode: str) -> 'DenseOutput':
+        """
+        Runge_Kutta가 TrajectoryBuffer에 저장한 행들에서 만든다.
+
+        Args:
+            stages : (step 개수, n_lanes + n_lanes*dim + 4*n_lanes*dim) 모양. 한 행은 [x, y, k1, k2, k3, k4]
+        """
+        n = stages.shape[0]
+        x = stages[:, :n_lanes]
+        y = stages[:, n_lanes:n_lanes*(1 + dim)].reshape(n, n_lanes, dim)
+        k = stages[:, n_lanes*(1 + dim):].reshape(n, 4, n_lanes, dim)
+        return cls(x, y, k, h, mode)
+
+    @property
+    def x_range(self) -> tuple:
+        """
+        계산할 수 있는 x의 범위. (lane마다의 처음 x, 마지막 x)
+        """
+        return self.x[0], self.x[-1] + self.h
+
+    def __call__(self, x) -> np.ndarray:
+        """
+        여러 x에서 y를 한 번에 계산한다.
+
+        Args:
+            x : scalar or 1-D array. batch mode이면 모든 lane에서 같은 x를 계산한다.
+
+        Returns:
+            scalar : x와 같은 모양
+            batch : (len(x), lane 개수)
+            system : (len(x), dim)
+        """
+        is_scalar = np.ndim(x) == 0
+        xq = np.atleast_1d(np.asarray(x, dtype=np.float64))
+        assert xq.ndim == 1, '"x" should be a scalar or a 1-D array.'
+        x0, x_end = self.x_range
+        lo, hi = np.minimum(x0, x_end), np.maximum(x0, x_end) # "distance" may be negative
+        tol = 1e-9 * np.abs(self.h)
+        assert np.all((xq[:, None] >= lo - tol) & (xq[:, None] <= hi + tol)), \
+            f'"x" should be in the calculated range; {np.array2string(lo)} ~ {np.array2string(hi)}'
+
+        # the grid is uniform in each lane. the stored x is used for theta to follow the rounding of x = x + h
+        n_steps, n_lanes = self.x.shape
+        idx = np.clip(np.floor((xq[:, None] - self.x[0]) / self.h).astype(np.int64), 0, n_steps - 1) # (m, lanes)
+        lanes = np.arange(n_lanes)
+        theta = (xq[:, None] - self.x[idx, lanes]) / self.h
+        theta2 = theta * theta
+        theta3 = theta2 * theta
+        b = np.stack((theta - 1.5*theta2 + theta3*(2/3),
+                      theta2 - theta3*(2/3),
+                      theta2 - theta3*(2/3),
+                      -0.5*theta2 + theta3*(2/3)), axis=-1) # (m, lanes, 4)
+        y = self.y[idx, lanes] + np.einsum('mlk,mlkd->mld', b, self.k[idx, :, lanes]) # (m, lanes, dim)
+
+        if self.mode == 'scalar':
+            y = y[:, 0, 0]
+            return y[0] if is_scalar else y
+        if self.mode == 'batch':
+            y = y[:, :, 0]
+        else:
+            y = y[:, 0, :]
+        return y[0] if is_scalar else y
+
+    def save(self, path: str) -> str:
+        np.savez(path, x=self.x, y=self.y, k=self.k, h=self.h, mode=self.mode)
+        return path
+
+    @classmethod
+    def load(cls, path: str) -> 'DenseOutput':
+        with np.load(path) as f:
+            return cls(f['x'], f['y'], f['k'], f['h'], str(f['mode']))
@@ -0,0 +1,121 @@
+from .base_adaptive_ode import Base_Adaptive_ODE
+from ...builder import METHODS
+import numpy as np
+
+@METHODS.store_module('Dormand_Prince')
+class Dormand_Prince(Base_Adaptive_ODE):
+    """
+    Adaptive step-size Dormand-Prince 5(4) method.
+
+    The local error is estimated by the embedded 4th order solution and the step size is
+    changed to satisfy "rtol" and "atol" until x reaches "end_x".
+    "iter_num" and "stop_diff" are not used. "distance" is the initial step size (optional).
+    "init_y" may be a list for a system of ODEs. In that case "fn" should return an ndarray.
+
+    example of config file;
+    ================================================================================
+        calculator = dict(
+        fn = lambda x, y: x + y,
+        input = dict(init_x = 0, init_y = 0, end_x = 1, rtol = 1e-6, atol = 1e-9),
+        type = 'Dormand_Prince',
+        print_interim = True,
+                )
+    ================================================================================
+
+    Every attempted step is saved in result.csv, both accepted and rejected;
+        x, y (or y_0, y_1, ...) : value after the step. (not changed when rejected)
+        h : step size which is tried
+        error : error norm scaled by rtol, atol. (accepted if error <= 1)
+        accepted : 1 or 0
+    """
+    step_columns = ('h', 'error', 'accepted')
+    initial_step_order = 4
+
+    # Butcher tableau
+    C = np.array([0, 1/5, 3/10, 4/5, 8/9, 1, 1])
+    A = np.array([
+        [0, 0, 0, 0, 0, 0],
+        [1/5, 0, 0, 0, 0, 0],
+        [3/40, 9/40, 0, 0, 0, 0],
+        [44/45, -56/15, 32/9, 0, 0, 0],
+        [19372/6561, -25360/2187, 64448/6561, -212/729, 0, 0],
+        [9017/3168, -355/33, 46732/5247, 49/176, -5103/18656, 0],
+        [35/384, 0, 500/1113, 125/192, -2187/6784, 11/84],
+    ])
+    B = np.array([35/384, 0, 500/1113, 125/192, -2187/6784, 11/84, 0]) # 5th order
+    E = B - np.array([5179/57600, 0, 7571/16695, 393/640, -92097/339200, 187/2100, 1/40]) # 5th - 4th
+
+    # step size control
+    SAFETY = 0.9
+    FACTOR_MIN = 0.2
+    FACTOR_MAX = 10.0
+
+    def _change_format(self, val) -> np.ndarray:
+        """
+        rtol, atol은 상수니까 속성으로 남긴다.
+        [x, y_0, y_1, ..., h, error, accepted] 모양의 ndarray를 내보낸다. (result.csv의 한 행)
+        """
+        record = self._make_record(val)
+        self.rtol = float(val.get('rtol', 1e-6))
+        self.atol = float(val.get('atol', 1e-9))
+        assert self.rtol > 0 or self.atol > 0, '"rtol" or "atol" should be positive.'
+        self.h = val.get('distance')
+        assert self.h is None or self.h > 0, '"distance" should be positive.'
+        self.K = np.empty((7, self.dim), dtype=np.float64) # k1, ..., k7
+        return record
+
+    def _prepare_fn(self, fn, val):
+        fn = self._vector_fn(fn)
+        x, y = val[0], val[1:1+self.dim]
+        self.K[0] = fn(x, y) # FSAL; k1 of the next step is k7 of the accepted step
+        self.n_fn_eval += 1
+        if self.h is None:
+            self.h = self._initial_step(fn, x, y, self.K[0])
+        return fn
+
+    def metrics_counters(self) -> dict:
+        return dict(accepted_steps=self.n_accepted, rejected_steps=self.n_rejected)
+
+    def _error_norm(self, err, y, y_new) -> float:
+        scale = self.atol + self.rtol * np.maximum(np.abs(y), np.abs(y_new))
+        return float(np.sqrt(np.mean((err / scale)**2)))
+
+    def _calculate_helper(self, fn, record: np.ndarray) -> np.ndarray:
+        """
+        한 step을 시도하고 error에 따라 accept 또는 reject한 후 다음 step size를 정한다.
+        error가 nan, inf이면 reject한다. step size가 x에서 구별할 수 없을 만큼 작아지면 (e.g. 해가 발산) 멈춘다.
+        """
+        K, A, C = self.K, self.A, self.C
+        x, y = record[0], record[1:1+self.dim]
+        h = min(self.h, self.end_x - x)
+
+        for i in range(1, 7):
+            K[i] = fn(x + C[i]*h, y + h * (A[i, :i] @ K[:i]))
+        self.n_fn_eval += 6
+        y_new = y + h * (A[6] @ K[:6]) # same as B @ K
+        error = self._error_norm(h * (self.E @ K), y, y_new)
+
+        record = record.copy()
+        record[-3] = h
+        record[-2] = error
+        if np.isfinite(error) and error <= 1:
+            self.n_accepted += 1
+            record[0] = self.end_x if h == self.end_x - x else x + h
+            record[1:1+self.dim] = y_new
+            record[-1] = 1
+            K[0] = K[6]
+            factor = self.FACTOR_MAX if error == 0 else self.SAFETY * error**(-1/5)
+            self.h = h * min(self.FACTOR_MAX, max(self.FACTOR_MIN, factor))
+        else:
+            self.n_rejected += 1
+            record[-1] = 0
+            self.h = h * (max(self.FACTOR_MIN, self.SAFETY * error**(-1/5)) if np.isfinite(error) else self.FACTOR_MIN)
+            if self.h < self._min_step(x):
+                self._stop_small_step(x)
+        return record
+
+    def log_interim(self, val_interim: np.ndarray, cnt: int, print_interim: bool) -> None:
+        if print_interim:
+            status = 'accepted' if val_interim[-1] else 'rejected'
+            self.logger_interim.info(f"The value of {cnt:>5}th step : y = {self._format_y(val_interim[1:1+self.dim])} when x = {val_interim[0]:6.3f} "
+                                     f"(h = {val_interim[-3]:.3e}, {status})")
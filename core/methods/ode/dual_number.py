@@ -0,0 +1,126 @@
+import numpy as np
+
+class Dual:
+    """
+    Dual number for forward-mode automatic differentiation.
+        val + der*e (e^2 = 0) 이므로 fn(Dual(x, 1))의 val은 fn(x), der는 fn'(x)가 된다.
+    val, der은 float 또는 ndarray. (ndarray이면 원소마다 미분)
+
+    "fn" should use operators or numpy functions (np.exp, np.log, np.sqrt, np.sin, ...).
+    Functions of math module call float() and raise TypeError, so the derivative is never lost silently.
+
+    Example:
+        >>> d = Dual(2.0, 1.0)
+        >>> out = 3*d**2 + np.exp(d)
+        >>> out.val, out.der # f(2), f'(2)
+    """
+    __slots__ = ('val', 'der')
+    __array_priority__ = 1000 # ndarray + Dual -> Dual.__radd__
+
+    def __init__(self, val, der=0.0) -> None:
+        self.val = val
+        self.der = der
+
+    @staticmethod
+    def _lift(other) -> 'Dual':
+        return other if isinstance(other, Dual) else Dual(other, 0.0)
+
+    def __repr__(self) -> str:
+        return f'Dual({self.val}, {self.der})'
+
+    def __float__(self):
+        raise TypeError('Dual number can not be converted to float. Use numpy functions instead of math functions.')
+
+    # arithmetic
+    def __add__(self, other):
+        other = self._lift(other)
+        return Dual(self.val + other.val, self.der + other.der)
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        other = self._lift(other)
+        return Dual(self.val - other.val, self.der - other.der)
+
+    def __rsub__(self, other):
+        return self._lift(other) - self
+
+    def __mul__(self, other):
+        other = self._lift(other)
+        return Dual(self.val * other.val, self.der * other.val + self.val * other.der)
+    __rmul__ = __mul__
+
+    def __truediv__(self, other):
+        other = self._lift(other)
+        return Dual(self.val / other.val, (self.der * other.val - self.val * other.der) / (other.val * other.val))
+
+    def __rtruediv__(self, other):
+        return self._lift(other) / self
+
+    def __pow__(self, other):
+        if isinstance(other, Dual):
+            val = np.power(self.val, other.val)
+            return Dual(val, val * (other.der * np.log(self.val) + other.val * self.der / self.val))
+        return Dual(np.power(self.val, other), other * np.power(self.val, other - 1) * self.der)
+
+    def __rpow__(self, other):
+        val = np.power(other, self.val)
+        return Dual(val, val * np.log(other) * self.der)
+
+    def __neg__(self):
+        return Dual(-self.val, -self.der)
+
+    def __pos__(self):
+        return self
+
+    def __abs__(self):
+        return Dual(np.abs(self.val), self.der * np.sign(self.val))
+
+    # comparison with the value (for piecewise fn)
+    def __lt__(self, other):
+        return self.val < self._lift(other).val
+
+    def __le__(self, other):
+        return self.val <= self._lift(other).val
+
+    def __gt__(self, other):
+        return self.val > self._lift(other).val
+
+    def __ge__(self, other):
+        return self.val >= self._lift(other).val
+
+    # numpy functions call these methods. (e.g. np.exp(Dual) -> Dual.exp())
+    def exp(self):
+        val = np.exp(self.val)
+        return Dual(val, val * self.der)
+
+    def log(self):
+        return Dual(np.log(self.val), self.der / self.val)
+
+    def log10(self):
+        return Dual(np.log10(self.val), self.der / (self.val * np.log(10)))
+
+    def sqrt(self):
+        val = np.sqrt(self.val)
+        return Dual(val, self.der / (2 * val))
+
+    def sin(self):
+        return Dual(np.sin(self.val), np.cos(self.val) * self.der)
+
+    def cos(self):
+        return Dual(np.cos(self.val), -np.sin(self.val) * self.der)
+
+    def tan(self):
+        return Dual(np.tan(self.val), self.der / np.cos(self.val)**2)
+
+    def arctan(self):
+        return Dual(np.arctan(self.val), self.der / (1 + self.val * self.val))
+
+    def sinh(self):
+        return Dual(np.sinh(self.val), np.cosh(self.val) * self.der)
+
+    def cosh(self):
+        return Dual(np.cosh(self.val), np.sinh(self.val) * self.der)
+
+    def tanh(self):
+        val = np.tanh(self.val)
+        return Dual(val, (1 - val * val) * self.der)
@@ -0,0 +1,98 @@
+import ast
+import numpy as np
+
+# functions and constants which can be used in an expression string. (Dual also supports most of them)
+FUNCTIONS = {
+    name: getattr(np, name) for name in (
+        'exp', 'log', 'log10', 'log2', 'sqrt', 'abs', 'sin', 'cos', 'tan', 'arcsin', 'arccos', 'arctan',
+        'sinh', 'cosh', 'tanh', 'minimum', 'maximum', 'where',
+    )
+}
+FUNCTIONS.update(pi=np.pi, e=np.e, _array=np.asarray) # _array wraps a list expression
+
+_ALLOWED_NODES = (
+    ast.Expression, ast.BinOp, ast.UnaryOp, ast.Call, ast.Name, ast.Load, ast.Constant,
+    ast.Subscript, ast.Slice, ast.List, ast.Tuple, ast.Compare,
+    ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod, ast.Pow, ast.USub, ast.UAdd,
+    ast.Lt, ast.LtE, ast.Gt, ast.GtE, ast.Eq, ast.NotEq,
+)
+
+# compiled functions; {(expr, variables): function}. same expression is compiled only once per process.
+_code_cache = {}
+
+class Expression:
+    """
+    "fn"을 lambda 대신 문자열로 쓸 때 사용한다. 한 번만 compile되고 NumPy 배열을 그대로 계산한다.
+    lambda와 달리 pickle할 수 있으므로 process pool에 보낼 수 있다. (문자열과 constants만 pickle된다.)
+
+    example of config file;
+    ================================================================================
+        calculator = dict(
+            fn = '6411.2*(x/(60*A))**1.2727*0.6 - B - 5.927*x + 0.0165*x*x',
+            constants = dict(A = 3.14159*(11**2)**4, B = 1531.9),
+            input = 1000,
+            type = 'Newton_Raphson',
+            ...
+                    )
+    ================================================================================
+
+    Only operators, numbers, variables, "constants" and numpy functions in FUNCTIONS can be used.
+    (e.g. exp(x), sqrt(x), sin(x); without "np.") A list such as '[y[1], -y[0]]' is returned as an ndarray.
+    """
+
+    def __init__(self, expr:str, variables=('x',), constants:dict=None) -> None:
+        """
+        Args:
+            expr : expression string. e.g. 'x + y'
+            variables : names of the arguments in order. e.g. ('x', 'y') for fn(x, y)
+            constants : dict of the constants used in expr
+        """
+        self.expr = expr
+        self.variables = tuple(variables)
+        self.constants = dict(constants or {})
+
+        key = (expr, self.variables)
+        fn = _code_cache.get(key)
+        if fn is None:
+            fn = self._compile(expr, self.variables)
+            _code_cache[key] = fn
+        unknown = [name for name in fn.__code__.co_names if name not in FUNCTIONS and name not in self.constants]
+        if unknown:
+            raise ValueError(f'Unknown names {unknown} in "{expr}". Add them to "constants".')
+        self._fn = type(fn)(fn.__code__, {**FUNCTIONS, **self.constants, '__builtins__': {}})
+
+    @staticmethod
+    def _compile(expr:str, variables:tuple):
+        try:
+            tree = ast.parse(expr.strip(), mode='eval')
+        except SyntaxError as e:
+            raise SyntaxError(f'There are syntax errors in the expression "{expr}": {e}')
+        for node in ast.walk(tree):
+            if not isinstance(node, _ALLOWED_NODES):
+                raise ValueError(f'{type(node).__name__} is not allowed in the expression "{expr}".')
+            if isinstance(node, ast.Call) and not isinstance(node.func, ast.Name):
+                raise ValueError(f'Only functions in FUNCTIONS can be called in the expression "{expr}". (without "np.")')
+            if isinstance(node, ast.Constant) and not isinstance(node.value, (int, float, complex)):
+                raise ValueError(f'Only numbers are allowed as literals in the expression "{expr}".')
+        if isinstance(tree.body, (ast.List, ast.Tuple)): # vector field of a system
+            tree.body = ast.Call(func=ast.Name(id='_array', ctx=ast.Load()), args=[tree.body], keywords=[])
+        # lambda of variables. arguments are locals so that a call is as fast as a lambda of config.
+        fn_tree = ast.Expression(ast.Lambda(
+            args=ast.arguments(posonlyargs=[], args=[ast.arg(arg=v) for v in variables], kwonlyargs=[],
+                               kw_defaults=[], defaults=[]),
+            body=tree.body))
+        ast.fix_missing_locations(fn_tree)
+        return eval(compile(fn_tree, f'<fn: {expr}>', 'eval'), {'__builtins__': {}})
+
+    def __call__(self, *args):
+        # scalar call is as fast as a lambda. (np.errstate costs more than the expression itself)
+        if not any(isinstance(getattr(arg, 'val', arg), np.ndarray) for arg in args):
+            return self._fn(*args)
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'): # nan or inf like np.vectorize of vectorize_fn
+            return self._fn(*args)
+
+    def __reduce__(self):
+        return (Expression, (self.expr, self.variables, self.constants))
+
+    def __repr__(self) -> str:
+        return f'Expression({self.expr!r}, variables={self.variables}, constants={self.constants})'
@@ -0,0 +1,73 @@
+from .base_root_finder import Base_Root_Finder
+from ...builder import METHODS
+import numpy as np
+
+@METHODS.store_module('Illinois')
+class Illinois(Base_Root_Finder):
+    """
+    Regula falsi with the Illinois modification.
+    bracket [a, b] 안에서 secant line의 근을 찾고, 같은 쪽 끝이 두 번 연속 남으면 그 끝의 fn을 절반으로 줄인다.
+    (regula falsi는 한 쪽 끝이 고정되어 느려지는데, 이를 막아서 superlinear로 수렴한다.)
+    example of config file;
+    ================================================================================
+        calculator = dict(
+            fn = lambda x: x*x - 2,
+            input = dict(a = 0, b = 2),
+            type = 'Illinois',
+            stop_diff = 1e-10,
+            print_interim = True,
+                    )
+    ================================================================================
+
+    fn(a)와 fn(b)의 부호가 달라야 한다. 근이 bracket 밖으로 나가지 않으므로 발산하지 않는다.
+    bracket의 폭이나 x의 변화가 "stop_diff"보다 작아지면 멈춘다.
+    result.csv; x, fn, a, b
+    """
+    columns = ('x', 'fn', 'a', 'b')
+
+    def _change_format(self, val) -> np.ndarray:
+        """
+        bracket 양 끝의 fn 값(fa, fb)과 마지막으로 바뀐 쪽(side)은 속성으로 남긴다.
+        """
+        a, b = float(val['a']), float(val['b'])
+        assert a != b, '"a" and "b" should be different.'
+        self.side = 0 # -1 : b was replaced last time, +1 : a was replaced last time
+        return np.array([b, np.nan, a, b])
+
+    def _init_state(self, fn, record: np.ndarray) -> None:
+        self.fa, self.fb = fn(record[2]), fn(record[3])
+        self.n_fn_eval += 2
+        assert self.fa * self.fb <= 0, f'"fn(a)" and "fn(b)" should have opposite signs. (fn(a) = {self.fa}, fn(b) = {self.fb})'
+        if abs(self.fa) < abs(self.fb):
+            record[0], record[1] = record[2], self.fa
+        else:
+            record[0], record[1] = record[3], self.fb
+        self.converged = record[1] == 0
+
+    def _calculate_helper(self, fn, record: np.ndarray) -> np.ndarray:
+        if self.converged:
+            return record
+        a, b = record[2], record[3]
+        fa, fb = self.fa, self.fb
+        x = b - fb*(b - a)/(fb - fa)
+        fx = fn(x)
+        self.n_fn_eval += 1
+        if fx * fb > 0: # x is on the side of b
+            b, fb = x, fx
+            if self.side == -1:
+                fa /= 2
+            self.side = -1
+        elif fx * fa > 0: # x is on the side of a
+            a, fa = x, fx
+            if self.side == +1:
+                fb /= 2
+            self.side = +1
+        else: # fx == 0
+            a = b = x
+            fa = fb = fx
+        self.fa, self.fb = fa, fb
+        self.converged = fx == 0 or abs(x - record[0]) <= self.xtol or abs(b - a) <= self.xtol
+        return np.array([x, fx, a, b])
+
+    def _is_not_converged(self, val: np.ndarray, pre_val: np.ndarray, stop_diff) -> bool:
+        return not self.converged
@@ -0,0 +1,142 @@
+"""
+HOW TO USE
+
+calculator에 jit = True를 적으면 fn과 반복 loop를 numba로 compile해서 한 번에 계산한다.
+numba가 없거나 fn을 compile할 수 없으면 경고를 남기고 원래 방법으로 계산한다.
+    예시)
+        >>> calculator = dict(
+        >>>     fn = lambda x, y: x + y,
+        >>>     input = dict(init_x = 0, init_y = 0, distance = 0.001),
+        >>>     type = 'Runge_Kutta',
+        >>>     iter_num = 1000000,
+        >>>     jit = True,
+        >>>             )
+
+    지원하는 계산; (나머지는 원래 방법으로 계산한다.)
+        Runge_Kutta : scalar, system
+        Newton_Raphson : scalar. 미분은 "dfn" 또는 centered divided difference를 사용한다. (dual number는 사용하지 않는다.)
+    fn은 math 모듈 함수, numpy 함수, 연산자만 사용해야 한다. (expression string fn도 가능)
+    compile에 시간이 걸리므로 (process마다 처음 한 번 약 0.5 ~ 1초) iter_num이 클 때 (약 1000000 이상) 사용한다.
+        100000 iteration 정도는 compile 시간 때문에 jit 없이 계산하는 것보다 느리다.
+    compile한 fn은 fn의 code와 fn이 사용하는 값(전역 변수, closure, 상수)으로 찾으므로
+    같은 process에서 config 파일을 다시 읽거나 batch worker가 같은 fn을 계산하면 compile하지 않는다.
+    (최근에 사용한 MAX_COMPILED_FNS개만 남긴다. disk에 cache하지 않는다; numba의 cache는 fn이 사용하는 전역 값의 변화를 모른다.)
+    "stream_chunk"가 있으면 kernel을 "stream_chunk" iteration씩 마지막 값에서 이어서 호출하므로 memory가 제한된다.
+"""
+
+import hashlib
+import importlib.util
+import json
+from collections import OrderedDict
+from utils.result_cache import fingerprint, UncacheableError
+from .expression import Expression
+
+MAX_COMPILED_FNS = 32
+
+_kernels = {}
+_compiled_fns = OrderedDict() # {key of fn: compiled fn}. compiled kernels are reused for the same compiled fn. (LRU)
+
+def is_available() -> bool:
+    return importlib.util.find_spec('numba') is not None
+
+def errors() -> tuple:
+    """
+    fn을 compile할 수 없을 때 numba가 발생시키는 에러들.
+    """
+    from numba.core.errors import NumbaError
+    return (NumbaError,)
+
+def compile_fn(fn):
+    """
+    fn을 numba로 compile한다. (실제 compile은 kernel 안에서 처음 호출될 때 일어난다.)
+    """
+    import numba
+    fn = getattr(fn, '__wrapped__', fn) # fn counted by utils/metrics.py
+    key = _fn_key(fn)
+    compiled = _compiled_fns.get(key) if key is not None else None
+    if compiled is None:
+        # Expression is compiled as its plain lambda whose globals are numpy functions and constants
+        compiled = numba.njit(fn._fn if isinstance(fn, Expression) else fn)
+        if key is not None:
+            _compiled_fns[key] = compiled
+            while len(_compiled_fns) > MAX_COMPILED_FNS:
+                _compiled_fns.popitem(last=False)
+    else:
+        _compiled_fns.move_to_end(key)
+    return compiled
+
+def _fn_key(fn):
+    """
+    fn의 code와 fn이 사용하는 값의 hash. numba는 전역 값을 compile할 때 상수로 넣으므로 값이 같아야 다시 사용할 수 있다.
+    hash할 수 없으면 None. (cache하지 않는다.)
+    """
+    value = ['expression', fn.expr, fn.variables, fn.constants] if isinstance(fn, Expression) else fn
+    try:
+        return hashlib.sha1(json.dumps(fingerprint(value)).encode()).hexdigest()
+    except UncacheableError:
+        return None
+
+def get_kernel(name: str):
+    """
+    numba를 처음 사용할 때 kernel들을 만든다.
+    """
+    if not _kernels:
+        _build_kernels()
+    return _kernels[name]
+
+def _build_kernels() -> None:
+    import numba
+    import numpy as np
+
+    @numba.njit
+    def runge_kutta(fn, x, y, h, n):
+        # same operations as Runge_Kutta._calculate_helper
+        rows = np.empty((n, 2))
+        for i in range(n):
+            k1 = h * fn(x, y)
+            k2 = h * fn(x + 0.5*h, y + 0.5*k1)
+            k3 = h * fn(x + 0.5*h, y + 0.5*k2)
+            k4 = h * fn(x + h, y + k3)
+            x = x + h
+            y = y + (k1 + 2*k2 + 2*k3 + k4)/6
+            rows[i, 0] = x
+            rows[i, 1] = y
+        return rows
+
+    @numba.njit
+    def runge_kutta_system(fn, state, h, n):
+        # same operations as Runge_Kutta._calculate_system_helper
+        rows = np.empty((n, state.shape[0]))
+        x = state[0]
+        y = state[1:].copy()
+        for i in range(n):
+            k1 = h * fn(x, y)
+            k2 = h * fn(x + 0.5*h, y + 0.5*k1)
+            k3 = h * fn(x + 0.5*h, y + 0.5*k2)
+            k4 = h * fn(x + h, y + k3)
+            y = y + (k1 + 2*(k2 + k3) + k4)/6
+            x = x + h
+            rows[i, 0] = x
+            rows[i, 1:] = y
+        return rows
+
+    @numba.njit
+    def newton_raphson(fn, dfn, use_dfn, x, n, stop_diff, dx):
+        # n iterations, or until |x - pre_x| <= stop_diff (stop_diff >= 0) within n iterations
+        rows = np.empty((n, 1))
+        cnt = 0
+        while cnt < n:
+            fx = fn(x)
+            if use_dfn:
+                dfx = dfn(x)
+            else:
+                dfx = (fn(x+dx) - fn(x-dx)) / (2*dx)
+            pre_x = x
+            x = x - fx/dfx
+            rows[cnt, 0] = x
+            cnt += 1
+            if stop_diff >= 0 and not abs(x - pre_x) > stop_diff:
+                break
+        return rows[:cnt]
+
+    _kernels.update(runge_kutta=runge_kutta, runge_kutta_system=runge_kutta_system, newton_raphson=newton_raphson)
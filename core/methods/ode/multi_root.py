@@ -0,0 +1,142 @@
+from .base_method_ode import Base_Method_ODE
+from ...builder import METHODS
+from utils.trajectory import TrajectoryBuffer
+import numpy as np
+
+@METHODS.store_module('Multi_Root')
+class Multi_Root(Base_Method_ODE):
+    """
+    구간 [a, b]의 모든 근을 찾는다.
+        1. fn을 "resolution"개의 작은 구간으로 나눈 grid에서 한 번에 (vectorize) 계산해서 부호가 바뀌는 구간(bracket)을 찾고
+        2. 모든 bracket을 lane으로 두고 Illinois method로 동시에 좁혀 간다. (iteration마다 fn을 한 번 계산)
+    example of config file;
+    ================================================================================
+        import math
+        A = math.pi*(11**2)**4
+
+        calculator = dict(
+            fn = lambda x: 6411.2*math.pow(x/(60*A),1.2727)*(0.5+0.1) - 1531.9 - 5.927*x + 0.0165 * x * x,
+            input = dict(a = 0, b = 5000, resolution = 1000),
+            type = 'Multi_Root',
+            stop_diff = 0.0000000001,
+            print_interim = True,
+                    )
+    ================================================================================
+
+    "stop_diff"는 x의 허용 오차로 사용한다. (없으면 2e-12) "iter_num"이면 iteration 횟수의 상한이다.
+    0th iteration은 grid 계산이다. grid 위의 점에서 fn이 0이면 그 점도 근이다.
+    부호가 바뀌지 않는 근(중근 등)은 찾을 수 없다.
+    불연속점(e.g. 1/x의 0)도 bracket이 되지만 |fn|이 grid에서보다 작아지지 않으므로 converged = 0으로 남는다.
+    result.csv has one row per root; x, fn, a, b (grid 구간), iteration, converged
+    """
+    columns = ('x', 'fn', 'a', 'b', 'iteration', 'converged')
+
+    def _sanity_check(self, inputs) -> None:
+        stop_diff = inputs.get('stop_diff')
+        self.xtol = 2e-12 if stop_diff is None else stop_diff
+        self.n_fn_eval = 0 # number of calls of fn
+        self.n_fn_points = 0 # number of points where fn is calculated
+
+    def _change_format(self, val) -> np.ndarray:
+        """
+        grid를 내보낸다. bracket들은 _prepare_fn에서 fn을 계산한 후 속성으로 만든다.
+        """
+        a, b = float(val['a']), float(val['b'])
+        resolution = int(val.get('resolution', 1000))
+        assert a < b, '"a" should be smaller than "b".'
+        assert resolution > 0, '"resolution" should be a positive integer.'
+        self.interval = (a, b)
+        return np.linspace(a, b, resolution + 1)
+
+    def _prepare_fn(self, fn, grid: np.ndarray):
+        fn = self.vectorize_fn(fn, grid)
+        f = np.asarray(fn(grid), dtype=np.float64)
+        self.n_fn_eval += 1
+        self.n_fn_points += grid.shape[0]
+
+        # grid points where fn is 0, and cells where the sign of fn changes
+        zero = np.flatnonzero(f == 0)
+        finite = np.isfinite(f[:-1]) & np.isfinite(f[1:])
+        cell = np.flatnonzero(finite & (f[:-1] != 0) & (f[1:] != 0) & (np.signbit(f[:-1]) != np.signbit(f[1:])))
+
+        order = np.argsort(np.concatenate((grid[zero], grid[cell])), kind='stable')
+        self.a = np.concatenate((grid[zero], grid[cell]))[order]
+        self.b = np.concatenate((grid[zero], grid[cell + 1]))[order]
+        self.fa = np.concatenate((f[zero], f[cell]))[order]
+        self.fb = np.concatenate((f[zero], f[cell + 1]))[order]
+        self.grid_a, self.grid_b = self.a.copy(), self.b.copy()
+        self.grid_f_min = np.minimum(np.abs(self.fa), np.abs(self.fb))
+        use_a = np.abs(self.fa) < np.abs(self.fb)
+        self.x = np.where(use_a, self.a, self.b)
+        self.fx = np.where(use_a, self.fa, self.fb)
+        self.side = np.zeros(self.x.shape, dtype=np.int8) # -1 : b was replaced last time, +1 : a was replaced last time
+        self.iteration = np.zeros(self.x.shape, dtype=np.int64)
+        self.converged = self.fx == 0
+        self.active = ~self.converged
+        return fn
+
+    def save_init_val_for_csv(self, val) -> None:
+        return # one row per root is saved by save_result_for_csv
+
+    def save_val_for_csv(self, idx:int, val) -> None:
+        return
+
+    def save_result_for_csv(self, val) -> None:
+        rows = [self.x, self.fx, self.grid_a, self.grid_b, self.iteration, self.converged]
+        self.result = TrajectoryBuffer(list(self.columns), capacity=max(1, self.x.shape[0]),
+                                       column_dtypes={'iteration': self.iteration.dtype, 'converged': self.converged.dtype})
+        self.result.extend(np.arange(self.x.shape[0]), np.column_stack(rows))
+
+    def _calculate_helper(self, fn, val) -> np.ndarray:
+        """
+        active인 bracket들을 Illinois method로 한 번에 좁힌다.
+        """
+        active = np.flatnonzero(self.active)
+        if active.shape[0] == 0:
+            return self.x.copy()
+        a, b, fa, fb, side = self.a[active], self.b[active], self.fa[active], self.fb[active], self.side[active]
+        x = b - fb*(b - a)/(fb - fa)
+        fx = np.asarray(fn(x), dtype=np.float64)
+        self.n_fn_eval += 1
+        self.n_fn_points += active.shape[0]
+
+        same_b = fx*fb > 0 # x is on the side of b
+        same_a = fx*fa > 0 # x is on the side of a
+        zero = fx == 0
+        fa = np.where(same_b & (side == -1), fa/2, fa)
+        fb = np.where(same_a & (side == +1), fb/2, fb)
+        a, fa = np.where(same_a | zero, x, a), np.where(same_a | zero, fx, fa)
+        b, fb = np.where(same_b | zero, x, b), np.where(same_b | zero, fx, fb)
+        side = np.where(same_b, -1, np.where(same_a, +1, side))
+
+        done = zero | (np.abs(x - self.x[active]) <= self.xtol) | (np.abs(b - a) <= self.xtol)
+        # a discontinuity (e.g. 0 of 1/x) is also a bracket. it is not a root if |fn| is not smaller than on the grid.
+        converged = done & (zero | (np.abs(fx) < self.grid_f_min[active]))
+        self.a[active], self.b[active], self.fa[active], self.fb[active], self.side[active] = a, b, fa, fb, side
+        self.x[active], self.fx[active] = x, fx
+        self.iteration[active] += 1
+        self.converged[active] = converged
+        self.active[active] = ~done & np.isfinite(x) # diverged lanes (e.g. nan of fn) are frozen too
+        return self.x.copy()
+
+    def _is_not_converged(self, val, pre_val, stop_diff) -> bool:
+        return bool(self.active.any())
+
+    def metrics_counters(self) -> dict:
+        return dict(roots=int(self.x.shape[0]), converged_roots=int(self.converged.sum()),
+                    fn_evaluations=self.n_fn_eval, fn_points=self.n_fn_points)
+
+    def log_result(self, val) -> None:
+        a, b = self.interval
+        self.logger_result.info(f"Result : {int(self.converged.sum())} roots of {self.x.shape[0]} brackets in [{a:g}, {b:g}] "
+                                f"({self.n_fn_eval} fn evaluations of {self.n_fn_points} points)")
+        for i, (x, fx, converged) in enumerate(zip(self.x, self.fx, self.converged)):
+            self.logger_result.info(f"    {i:>3} : {x:6.6f} (fn = {fx:.3e}{'' if converged else ', not converged'})")
+
+    def log_interim(self, val_interim, cnt: int, print_interim: bool) -> None:
+        if not print_interim:
+            return
+        if cnt == 0:
+            self.logger_interim.info(f"The value of {cnt:>5}th iteration : {self.x.shape[0]} brackets on {val_interim.shape[0]} grid points")
+            return
+        self.logger_interim.info(f"The value of {cnt:>5}th iteration : {int(self.active.sum())} of {self.x.shape[0]} brackets are refining")
@@ -1,6 +1,8 @@
 from .base_method_ode import Base_Method_ODE
+from . import jit
 from ...builder import METHODS
-import pandas as pd
+from utils.trajectory import TrajectoryBuffer
+import numpy as np
 
 @METHODS.store_module('Newton_Raphson')
 class Newton_Raphson(Base_Method_ODE):
@@ -21,30 +23,137 @@ class Newton_Raphson(Base_Method_ODE):
                     )
     ================================================================================
 
+    The derivative is calculated in order of;
+        1. "dfn" (lambda expression or expression string of the derivative) if it is in the config.
+        2. dual number (exact, fn is evaluated only once) if "fn" uses only operators and numpy functions.
+        3. centered divided difference. (e.g. "fn" uses math module)
+    With "jit" = True, "dfn" or centered divided difference is used. (see core/methods/ode/jit.py)
+        numba compiles fn once per process (about 0.5 ~ 1 sec), so "jit" pays off only for a very large "iter_num".
+
+    If "input" is a list (or ndarray), every element is calculated at once as a lane (batch mode).
+        Converged lanes are frozen, and "stop_diff" stops when all lanes are converged.
+        result.csv has one row per lane; input, x, fn, iteration (, converged).
     """
 
-    def _change_format(self, val: float) -> float:
-        return val
-
-    def save_init_val_for_csv(self, val: float) -> None:
-        x = {
-            0: val
-        }
-        x = pd.Series(x)
-        self.df = pd.DataFrame({
-            'x' : x,
-        })
-    
-    def save_val_for_csv(self, idx:int, val:float):
-        self.df.loc[idx] = val
-
-    def _calculate_helper(self, fn, x: float) -> float:
-        x = x - fn(x)/self.cal_centered_divided_difference(fn, x)
+    def _sanity_check(self, inputs) -> None:
+        self.is_stop_diff = inputs.get('stop_diff') is not None
+        self.dfn = self.compile_fn(inputs.get('dfn'), inputs)
+
+    def _change_format(self, val):
+        """
+        batch mode이면 lane마다의 상태(active, converged, iteration)를 속성으로 남긴다.
+        """
+        self.is_batch = isinstance(val, (list, tuple, np.ndarray))
+        if not self.is_batch:
+            return val
+        x = np.asarray(val, dtype=np.float64).ravel()
+        self.init_val = x.copy()
+        self.active = np.ones(x.shape, dtype=bool)
+        self.converged = np.zeros(x.shape, dtype=bool)
+        self.iteration = np.zeros(x.shape, dtype=np.int64)
+        return x
+
+    def _prepare_fn(self, fn, val):
+        if self.dfn is not None:
+            self.derivative = 'dfn'
+        elif self.supports_dual(fn, val):
+            self.derivative = 'dual'
+        else:
+            self.derivative = 'centered'
+        if not self.is_batch:
+            return fn
+        if self.derivative == 'dfn':
+            self.dfn = self.vectorize_fn(self.dfn, val)
+        self._fn = fn if self.derivative == 'dual' else self.vectorize_fn(fn, val)
+        return self._fn
+
+    def _jit_calculate(self, fn, x, iter_num: int, stop_diff):
+        if self.is_batch:
+            return None
+        use_dfn = self.derivative == 'dfn'
+        jit_fn = jit.compile_fn(fn)
+        jit_dfn = jit.compile_fn(self.dfn) if use_dfn else jit_fn
+        return jit.get_kernel('newton_raphson')(jit_fn, jit_dfn, use_dfn, float(x), iter_num,
+                                                -1.0 if stop_diff is None else float(stop_diff), 1e-5)
+
+    def _row_to_val(self, row):
+        return float(row[0])
+
+    def metrics_counters(self) -> dict:
+        if not self.is_batch:
+            return {}
+        counters = dict(lanes=int(self.init_val.shape[0]), max_lane_iterations=int(self.iteration.max()))
+        if self.is_stop_diff:
+            counters['converged_lanes'] = int(self.converged.sum())
+        return counters
+
+    def _fn_and_derivative(self, fn, x):
+        if self.derivative == 'dual':
+            return self.cal_dual_derivative(fn, x)
+        if self.derivative == 'dfn':
+            return fn(x), self.dfn(x)
+        return fn(x), self.cal_centered_divided_difference(fn, x)
+
+    def save_init_val_for_csv(self, val) -> None:
+        if self.is_batch:
+            return # one row per lane is saved by save_result_for_csv
+        self.result = TrajectoryBuffer(['x'])
+        self.result.append(0, val)
+
+    def save_val_for_csv(self, idx:int, val):
+        if self.is_batch:
+            return
+        self.result.append(idx, val)
+
+    def save_result_for_csv(self, val) -> None:
+        if not self.is_batch:
+            return
+        columns = ['input', 'x', 'fn', 'iteration']
+        rows = [self.init_val, val, self._fn(val), self.iteration]
+        column_dtypes = {'iteration': self.iteration.dtype}
+        if self.is_stop_diff:
+            columns.append('converged')
+            rows.append(self.converged)
+            column_dtypes['converged'] = self.converged.dtype
+        self.result = TrajectoryBuffer(columns, capacity=val.shape[0], column_dtypes=column_dtypes)
+        self.result.extend(np.arange(val.shape[0]), np.column_stack(rows))
+
+    def _calculate_helper(self, fn, x):
+        if not self.is_batch:
+            fx, dfx = self._fn_and_derivative(fn, x)
+            x = x - fx/dfx
+            return x
+
+        # update only the lanes which are not converged yet
+        x = x.copy()
+        active = self.active
+        fx, dfx = self._fn_and_derivative(fn, x[active])
+        x[active] -= fx/dfx
+        self.iteration[active] += 1
+        self.active = active & np.isfinite(x) # diverged lanes are frozen too
         return x
 
-    def log_result(self, val: float) -> None:
-        self.logger_result.info(f"Result : {val:6.6f}")
+    def _is_not_converged(self, x, pre_x, stop_diff: float) -> bool:
+        if not self.is_batch:
+            return super()._is_not_converged(x, pre_x, stop_diff)
+        converged = self.active & (np.abs(x - pre_x) <= stop_diff)
+        self.converged |= converged
+        self.active &= ~converged
+        return bool(self.active.any())
+
+    def log_result(self, val) -> None:
+        if not self.is_batch:
+            self.logger_result.info(f"Result : {val:6.6f}")
+            return
+        msg = f"Result : {val.shape[0]} lanes are saved in result.csv"
+        if self.is_stop_diff:
+            msg += f" ({int(self.converged.sum())} converged)"
+        self.logger_result.info(msg)
 
-    def log_interim(self, val_interim: float, cnt: int, print_interim: bool) -> None:
-        if print_interim:
-            self.logger_interim.info(f"The value of {cnt:>5}th iteration : {val_interim:6.6f}")
\ No newline at end of file
+    def log_interim(self, val_interim, cnt: int, print_interim: bool) -> None:
+        if not print_interim:
+            return
+        if not self.is_batch:
+            self.logger_interim.info(f"The value of {cnt:>5}th iteration : {val_interim:6.6f}")
+            return
+        self.logger_interim.info(f"The value of {cnt:>5}th iteration : {int(self.active.sum())} of {val_interim.shape[0]} lanes are iterating")
@@ -0,0 +1,229 @@
+from .base_method_ode import Base_Method_ODE
+from ...builder import METHODS
+from utils.trajectory import TrajectoryBuffer
+import numpy as np
+
+EPS = np.finfo(np.float64).eps
+
+@METHODS.store_module('Newton_System')
+class Newton_System(Base_Method_ODE):
+    """
+    Newton method for a system of nonlinear equations F(x) = 0. (x, F(x) are vectors)
+
+    example of config file;
+    ================================================================================
+        import numpy as np
+        n = 100
+
+        calculator = dict(
+            fn = lambda x: (3 - 2*x)*x - np.concatenate((np.zeros_like(x[:1]), x[:-1]))
+                                       - 2*np.concatenate((x[1:], np.zeros_like(x[:1]))) + 1,
+            input = dict(init_x = -np.ones(n), sparsity = np.eye(n) + np.eye(n, k=1) + np.eye(n, k=-1), broyden = True),
+            type = 'Newton_System',
+            stop_diff = 1e-10,
+            print_interim = True,
+                    )
+    ================================================================================
+
+    input;
+        init_x : initial vector
+        sparsity (optional) : (n, n) array. nonzero where the Jacobian can be nonzero.
+            Columns which do not share a nonzero row are perturbed together (Curtis-Powell-Reid grouping),
+            so a tridiagonal Jacobian needs 3 groups for any n.
+        broyden (optional) : If True, the inverse Jacobian is updated by Broyden's method (Sherman-Morrison, no fn evaluation)
+            and the Jacobian is calculated again only when |F| does not decrease.
+
+    The Jacobian is calculated in order of;
+        1. "dfn" (lambda x: Jacobian matrix) if it is in the config.
+        2. centered divided difference of every column group with one fn call of (n, 2 * number of groups) points.
+            fn should accept x of shape (n, m) and return (n, m) for that. Otherwise fn is called for every point.
+
+    "stop_diff" stops when max |x - pre_x| <= stop_diff (or F(x) = 0). With "iter_num", fn is not calculated any more after F(x) = 0.
+    If the Newton step is zero or not finite while F(x) != 0 (e.g. a singular Jacobian), a warning is logged
+    and it is stopped as not converged. (x is not changed any more, also with "iter_num")
+    result.csv has the columns x_0, x_1, ..., residual (max |F(x)|)
+    fn을 호출한 횟수와 계산한 점(vector)의 개수는 log_result와 metrics.json에 남긴다.
+    """
+
+    def _sanity_check(self, inputs) -> None:
+        self.dfn = self.compile_fn(inputs.get('dfn'), inputs)
+        self.n_fn_eval = 0 # number of calls of fn
+        self.n_fn_points = 0 # number of x where fn is calculated
+        self.n_jac_eval = 0
+        self.stalled = False # the Newton step is zero or not finite while F(x) != 0
+
+    def _change_format(self, val) -> np.ndarray:
+        """
+        column group과 Broyden 사용 여부는 속성으로 남긴다.
+        [x_0, x_1, ..., residual] 모양의 ndarray를 내보낸다. (result.csv의 한 행)
+        """
+        x = np.asarray(val.init_x, dtype=np.float64).ravel()
+        self.dim = x.shape[0]
+        self.use_broyden = bool(val.get('broyden', False))
+        sparsity = val.get('sparsity')
+        if sparsity is None:
+            self.sparsity = None
+            self.groups = np.arange(self.dim)
+        else:
+            self.sparsity = np.asarray(sparsity) != 0
+            assert self.sparsity.shape == (self.dim, self.dim), f'"sparsity" should be of shape ({self.dim}, {self.dim}).'
+            self.groups = self.group_columns(self.sparsity)
+        self.n_groups = int(self.groups.max()) + 1
+        record = np.empty(self.dim + 1, dtype=np.float64)
+        record[:self.dim] = x
+        record[-1] = np.nan
+        return record
+
+    @staticmethod
+    def group_columns(sparsity: np.ndarray) -> np.ndarray:
+        """
+        nonzero인 row가 겹치지 않는 column들을 같은 group으로 묶는다. (greedy)
+
+        Returns:
+            group index of each column
+        """
+        n_rows, n_cols = sparsity.shape
+        groups = np.empty(n_cols, dtype=np.int64)
+        used_rows = [] # rows which are nonzero in each group
+        for j in range(n_cols):
+            for g, used in enumerate(used_rows):
+                if not (used & sparsity[:, j]).any():
+                    used |= sparsity[:, j]
+                    groups[j] = g
+                    break
+            else:
+                used_rows.append(sparsity[:, j].copy())
+                groups[j] = len(used_rows) - 1
+        return groups
+
+    def _prepare_fn(self, fn, record: np.ndarray):
+        x = record[:self.dim]
+        self.F = self._count(np.asarray(fn(x), dtype=np.float64), 1)
+        assert self.F.shape == (self.dim,), f'"fn" should return a vector of the same shape as "init_x"; ({self.dim},)'
+        record[-1] = np.max(np.abs(self.F)) if self.dim else 0.0
+        self.H = None # inverse Jacobian for Broyden. None if the Jacobian should be calculated again
+        if self.dfn is None:
+            self.batch_fn = self._batch_fn(fn, x)
+        return fn
+
+    def _count(self, out, n_points: int):
+        self.n_fn_eval += 1
+        self.n_fn_points += n_points
+        return out
+
+    def _batch_fn(self, fn, x: np.ndarray):
+        """
+        fn이 (n, m) 모양의 x를 column마다 계산할 수 있으면 한 번에, 아니면 column마다 계산하는 함수를 반환한다.
+        (e.g. A @ x - b는 (n, m)에서 b가 잘못 broadcast될 수 있으므로 column마다의 값과 비교한다.)
+        """
+        def column_fn(X):
+            out = np.empty(X.shape, dtype=np.float64)
+            for j in range(X.shape[1]):
+                out[:, j] = self._count(fn(X[:, j]), 1)
+            return out
+
+        X = np.column_stack((x, x + np.linspace(0.1, 0.2, self.dim)))
+        try:
+            out = np.asarray(fn(X), dtype=np.float64)
+        except (TypeError, ValueError, IndexError):
+            return column_fn
+        finally:
+            self._count(None, 2)
+        if out.shape != X.shape or not np.allclose(out, column_fn(X), equal_nan=True):
+            return column_fn
+        return lambda X: self._count(np.asarray(fn(X), dtype=np.float64), X.shape[1])
+
+    def _jacobian(self, fn, x: np.ndarray) -> np.ndarray:
+        """
+        column group마다 centered divided difference를 계산한다. (x + P, x - P를 한 번에 계산)
+        group의 column들은 nonzero row가 겹치지 않으므로 J[i, j] = (F(x + P_g) - F(x - P_g))[i] / 2h_j
+        """
+        self.n_jac_eval += 1
+        if self.dfn is not None:
+            return np.asarray(self.dfn(x), dtype=np.float64).reshape(self.dim, self.dim)
+        h = EPS**(1/3) * np.maximum(np.abs(x), 1.0)
+        P = np.zeros((self.dim, self.n_groups), dtype=np.float64)
+        P[np.arange(self.dim), self.groups] = h
+        F = self.batch_fn(np.hstack((x[:, None] + P, x[:, None] - P)))
+        diff = (F[:, :self.n_groups] - F[:, self.n_groups:])[:, self.groups] / (2*h)
+        if self.sparsity is not None:
+            diff[~self.sparsity] = 0.0
+        return diff
+
+    def _calculate_helper(self, fn, record: np.ndarray) -> np.ndarray:
+        if record[-1] == 0 or self.stalled: # "iter_num" keeps the same value without more fn evaluations
+            return record.copy()
+        x, F = record[:self.dim], self.F
+        if self.use_broyden:
+            is_updated = self.H is not None # H of Broyden updates. the Jacobian is calculated again before stopping
+            if self.H is None:
+                self.H = self._inverse(self._jacobian(fn, x))
+            dx = -self.H.dot(F)
+            if is_updated and self._is_stalled(dx):
+                self.H = self._inverse(self._jacobian(fn, x))
+                dx = -self.H.dot(F)
+        else:
+            J = self._jacobian(fn, x)
+            try:
+                dx = np.linalg.solve(J, -F)
+            except np.linalg.LinAlgError: # singular
+                dx = np.linalg.lstsq(J, -F, rcond=None)[0]
+        if self._is_stalled(dx):
+            self.stalled = True
+            self.logger_interim.warning(f'The Newton step is zero or not finite at x = {np.array2string(x, precision=6, threshold=10)} '
+                                        f'(max |fn| = {record[-1]:.3e}). Newton_System is stopped without convergence.')
+            return record.copy()
+        x_new = x + dx
+        F_new = self._count(np.asarray(fn(x_new), dtype=np.float64), 1)
+
+        if self.use_broyden:
+            if not np.max(np.abs(F_new)) < np.max(np.abs(F)):
+                self.H = None # convergence is slow. the Jacobian is calculated again at x_new
+            else:
+                # good Broyden update of the inverse; H += (dx - H dF) dx^T H / (dx^T H dF)
+                Hdf = self.H.dot(F_new - F)
+                denom = dx.dot(Hdf)
+                if denom != 0:
+                    self.H += np.outer(dx - Hdf, dx.dot(self.H)) / denom
+        self.F = F_new
+        record = np.empty_like(record)
+        record[:self.dim] = x_new
+        record[-1] = np.max(np.abs(F_new)) if self.dim else 0.0
+        return record
+
+    @staticmethod
+    def _is_stalled(dx: np.ndarray) -> bool:
+        return not np.all(np.isfinite(dx)) or not np.any(dx)
+
+    @staticmethod
+    def _inverse(J: np.ndarray) -> np.ndarray:
+        try:
+            return np.linalg.inv(J)
+        except np.linalg.LinAlgError: # singular
+            return np.linalg.pinv(J)
+
+    def _is_not_converged(self, val: np.ndarray, pre_val: np.ndarray, stop_diff) -> bool:
+        return val[-1] != 0 and not self.stalled and np.max(np.abs(val[:self.dim] - pre_val[:self.dim])) > stop_diff
+
+    def _convergence_value(self, record: np.ndarray) -> np.ndarray:
+        return record[:self.dim]
+
+    def save_init_val_for_csv(self, val: np.ndarray) -> None:
+        self.result = TrajectoryBuffer([f'x_{i}' for i in range(self.dim)] + ['residual'])
+        self.result.append(0, val)
+
+    def metrics_counters(self) -> dict:
+        return dict(fn_evaluations=self.n_fn_eval, fn_points=self.n_fn_points, jacobian_evaluations=self.n_jac_eval,
+                    column_groups=self.n_groups)
+
+    def log_result(self, val: np.ndarray) -> None:
+        self.logger_result.info(f"Result : x = {np.array2string(val[:self.dim], precision=6, threshold=10)} (max |fn| = {val[-1]:.3e})")
+        self.logger_result.info(f"    {self.n_fn_eval} fn evaluations of {self.n_fn_points} points, {self.n_jac_eval} jacobians"
+                                f" ({self.n_groups} column groups)")
+        if self.stalled:
+            self.logger_result.info("    not converged; the Newton step is zero or not finite")
+
+    def log_interim(self, val_interim: np.ndarray, cnt: int, print_interim: bool) -> None:
+        if print_interim:
+            self.logger_interim.info(f"The value of {cnt:>5}th iteration : x = {np.array2string(val_interim[:self.dim], precision=6, threshold=10)} "
+                                     f"(max |fn| = {val_interim[-1]:.3e})")
@@ -1,17 +1,15 @@
-"""
-TODO
-1. 여러 개의 distance를 한 번에 계산
-"""
-
 from .base_method_ode import Base_Method_ODE
+from .dense_output import DenseOutput
+from . import jit
 from ...builder import METHODS
-import pandas as pd
+from utils.trajectory import TrajectoryBuffer
+import numpy as np
 
 @METHODS.store_module('Runge_Kutta')
 class Runge_Kutta(Base_Method_ODE):
     """
     4th Runge-Kutta method.
-    
+
     For this method, "iter_num" means n. "stop_diff" is not supported.
         For example, init_x = 0 and iter_num = 5 means x = [0, 0.2, 0.4, 0.6, 0.8, 1.0]
 
@@ -25,38 +23,137 @@ class Runge_Kutta(Base_Method_ODE):
         print_interim = True,
                 )
     ================================================================================
-                    
+
+    If any of "distance", "init_x", "init_y" is a list (or ndarray), they are broadcast to lanes
+    and every lane is calculated at once (batch mode).
+        For example, input = dict(init_x = 0, init_y = [0, 1], distance = [0.2, 0.1])
+        result.csv has the columns x_0, y_0, x_1, y_1, ...
+
+    If "system" is True in "input", "init_y" is the initial state vector of a system of ODEs
+    and "fn" should return an ndarray of the same shape as y. (only one trajectory)
+        For example,
+            import numpy as np
+            calculator = dict(
+                fn = lambda x, y: np.array([y[1], -y[0]]),
+                input = dict(init_x = 0, init_y = [1, 0], distance = 0.1, system = True),
+                ...
+        result.csv has the columns x, y_0, y_1, ...
+
+    If "dense_output" is True, the stages k1, ..., k4 of every step are kept and y between the grid points
+    is calculated without more fn evaluations. (see core/methods/ode/dense_output.py)
+        method.dense(x) : y at many x at once. It is also saved as dense_output.npz in the log directory.
+        "jit" is not used with "dense_output".
+
+    With "jit" = True, fn and the loop are compiled by numba (scalar and system only, see core/methods/ode/jit.py).
+        The compile takes about 0.5 ~ 1 sec once per process, so it pays off only for long runs. (about iter_num >= 1000000)
     """
+    fn_variables = ('x', 'y')
+    checkpoint_buffers = Base_Method_ODE.checkpoint_buffers + ('stages',)
+
     def _sanity_check(self, inputs) -> None:
         is_stop_diff = inputs.get('stop_diff') or inputs.get('stop_diff')==0
         assert not is_stop_diff, '"stop_diff" is not supported for Runge-Kutta'
+        self.use_dense = bool(inputs.get('dense_output', False))
+        self.dense_path = inputs._dir + 'dense_output.npz'
+        self.stages = None
 
-    def _change_format(self, val) -> list[float]:
+    def _change_format(self, val):
         """
         distance는 상수니까 속성으로 남긴다. 출력해야 하는 x, y값만 내보내기
+        batch mode이면 x, y를 (2, lane 개수) 모양의 ndarray로 내보낸다.
+        system이면 [x, y_0, y_1, ...] 모양의 ndarray 하나로 내보내고 매 iteration마다 그 자리에서 갱신한다.
         """
-        self.distance = val.distance
-        xy_pair = [val.init_x, val.init_y]
+        self.is_system = bool(val.get('system', False))
+        if self.is_system:
+            assert not any(isinstance(v, (list, tuple, np.ndarray)) for v in (val.distance, val.init_x)), \
+                '"distance" and "init_x" should be scalars when "system" is True.'
+            self.is_batch = False
+            self.distance = float(val.distance)
+            init_y = np.asarray(val.init_y, dtype=np.float64).ravel()
+            state = np.empty(init_y.shape[0] + 1, dtype=np.float64)
+            state[0] = val.init_x
+            state[1:] = init_y
+            self._stage_y = np.empty_like(init_y) # y of k2, k3, k4 stages
+            return state
+
+        self.is_batch = any(isinstance(v, (list, tuple, np.ndarray)) for v in (val.distance, val.init_x, val.init_y))
+        if not self.is_batch:
+            self.distance = val.distance
+            xy_pair = [val.init_x, val.init_y]
+            return xy_pair
+
+        distance, init_x, init_y = np.broadcast_arrays(*(np.asarray(v, dtype=np.float64).ravel()
+                                                         for v in (val.distance, val.init_x, val.init_y)))
+        self.distance = distance.copy()
+        xy_pair = np.stack((init_x, init_y))
         return xy_pair
-    
-    def save_init_val_for_csv(self, val: list[float]) -> None:
-        x = {
-            0: val[0]
-        }
-        y = {
-            0: val[1]
-        }
-        x = pd.Series(x)
-        y = pd.Series(y)
-        self.df = pd.DataFrame({
-            'x' : x,
-            'y' : y,
-        })
-    
-    def save_val_for_csv(self, idx:int, val:list[float]):
-        self.df.loc[idx] = val
-
-    def _calculate_helper(self, fn, xy_pair: list[float]) -> list[float]:
+
+    def _prepare_fn(self, fn, val):
+        if self.is_system:
+            assert np.shape(fn(val[0], val[1:])) == val[1:].shape, '"fn" should return an ndarray of the same shape as "init_y".'
+            return fn
+        if not self.is_batch:
+            return fn
+        return self.vectorize_fn(fn, val[0], val[1])
+
+    @property
+    def dense(self) -> DenseOutput:
+        """
+        저장한 stage로 처음 사용할 때 한 번만 만든다. ("dense_output"이 True일 때)
+        """
+        assert self.stages is not None, 'Set "dense_output" to True to use the dense output.'
+        if getattr(self, '_dense', None) is None:
+            mode = 'system' if self.is_system else 'batch' if self.is_batch else 'scalar'
+            n_lanes = self.distance.shape[0] if self.is_batch else 1
+            dim = self._stage_y.shape[0] if self.is_system else 1
+            self._dense = DenseOutput.from_stages(self.stages.data, self.distance, n_lanes, dim, mode)
+        return self._dense
+
+    def save_result_for_csv(self, val) -> None:
+        if self.stages is not None:
+            self.dense.save(self.dense_path)
+
+    def save_init_val_for_csv(self, val) -> None:
+        if self.use_dense:
+            # a row per step; x, y at the start of the step and k1, ..., k4
+            n_values = val.shape[0] - 1 if self.is_system else val.shape[1] if self.is_batch else 1
+            n_lanes = 1 if self.is_system else n_values
+            self.stages = TrajectoryBuffer([f'c{i}' for i in range(n_lanes + 5*n_values)])
+        if self.is_system:
+            self.result = TrajectoryBuffer(['x'] + [f'y_{i}' for i in range(val.shape[0] - 1)])
+            self.result.append(0, val)
+            return
+        if not self.is_batch:
+            self.result = TrajectoryBuffer(['x', 'y'])
+            self.result.append(0, val)
+            return
+        columns = [f'{name}_{lane}' for lane in range(val.shape[1]) for name in ('x', 'y')]
+        self.result = TrajectoryBuffer(columns)
+        self.result.append(0, val.T.ravel())
+
+    def save_val_for_csv(self, idx:int, val):
+        if not self.is_batch:
+            self.result.append(idx, val)
+            return
+        self.result.append(idx, val.T.ravel()) # x_0, y_0, x_1, y_1, ...
+
+    def _jit_calculate(self, fn, val, iter_num: int, stop_diff):
+        if self.use_dense:
+            return None
+        if self.is_system:
+            return jit.get_kernel('runge_kutta_system')(jit.compile_fn(fn), val.copy(), self.distance, iter_num)
+        if self.is_batch:
+            return None
+        return jit.get_kernel('runge_kutta')(jit.compile_fn(fn), float(val[0]), float(val[1]), float(self.distance), iter_num)
+
+    def _row_to_val(self, row):
+        if self.is_system:
+            return row
+        return [row[0], row[1]]
+
+    def _calculate_helper(self, fn, xy_pair):
+        if self.is_system:
+            return self._calculate_system_helper(fn, xy_pair)
         h = self.distance
         x, y = xy_pair[0], xy_pair[1]
 
@@ -64,17 +161,57 @@ class Runge_Kutta(Base_Method_ODE):
         k2 = h * fn(x + 0.5*h, y + 0.5*k1)
         k3 = h * fn(x + 0.5*h, y + 0.5*k2)
         k4 = h * fn(x + h, y + k3)
+        if self.stages is not None:
+            self.stages.append(len(self.stages), np.concatenate((x, y, k1, k2, k3, k4)) if self.is_batch else (x, y, k1, k2, k3, k4))
 
         x = x + h
         y = y + (k1 + 2*k2 + 2*k3 + k4)/6
 
+        if self.is_batch:
+            return np.stack((x, y))
         xy_pair = [x, y]
         return xy_pair
 
-    def log_result(self, val: list[float]) -> None:
-        self.logger_result.info(f"Result : y = {val[1]:6.6f} when x = {val[0]:6.3f}")
+    def _calculate_system_helper(self, fn, state: np.ndarray) -> np.ndarray:
+        """
+        state = [x, y_0, y_1, ...]를 whole-array 연산으로 갱신한다.
+        """
+        h = self.distance
+        x, y = state[0], state[1:]
+        stage_y = self._stage_y
 
-    def log_interim(self, val_interim: list[float], cnt: int, print_interim: bool) -> None:
-        if print_interim:        
-            self.logger_interim.info(f"The value of {cnt:>3}th iteration : y = {val_interim[1]:6.6f} when x = {val_interim[0]:6.3f}")
+        k1 = h * fn(x, y)
+        k2 = h * fn(x + 0.5*h, np.add(y, 0.5*k1, out=stage_y))
+        k3 = h * fn(x + 0.5*h, np.add(y, 0.5*k2, out=stage_y))
+        k4 = h * fn(x + h, np.add(y, k3, out=stage_y))
+        if self.stages is not None:
+            self.stages.append(len(self.stages), np.concatenate((state, k1, k2, k3, k4)))
 
+        k2 += k3
+        k2 *= 2
+        k1 += k2
+        k1 += k4
+        k1 /= 6
+        y += k1 # y is a view of state
+        state[0] = x + h
+        return state
+
+    def log_result(self, val) -> None:
+        if self.is_system:
+            self.logger_result.info(f"Result : y = {np.array2string(val[1:], precision=6)} when x = {val[0]:6.3f}")
+            return
+        if not self.is_batch:
+            self.logger_result.info(f"Result : y = {val[1]:6.6f} when x = {val[0]:6.3f}")
+            return
+        self.logger_result.info(f"Result : y = {np.array2string(val[1], precision=6)} when x = {np.array2string(val[0], precision=3)}")
+
+    def log_interim(self, val_interim, cnt: int, print_interim: bool) -> None:
+        if not print_interim:
+            return
+        if self.is_system:
+            self.logger_interim.info(f"The value of {cnt:>3}th iteration : y = {np.array2string(val_interim[1:], precision=6)} when x = {val_interim[0]:6.3f}")
+            return
+        if not self.is_batch:
+            self.logger_interim.info(f"The value of {cnt:>3}th iteration : y = {val_interim[1]:6.6f} when x = {val_interim[0]:6.3f}")
+            return
+        self.logger_interim.info(f"The value of {cnt:>3}th iteration : y = {np.array2string(val_interim[1], precision=6)} when x = {np.array2string(val_interim[0], precision=3)}")
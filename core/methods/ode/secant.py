@@ -0,0 +1,51 @@
+from .base_root_finder import Base_Root_Finder
+from ...builder import METHODS
+import numpy as np
+
+@METHODS.store_module('Secant')
+class Secant(Base_Root_Finder):
+    """
+    Secant method. fn을 iteration마다 한 번만 계산한다. (Newton-Raphson의 centered divided difference는 세 번)
+    example of config file;
+    ================================================================================
+        calculator = dict(
+            fn = lambda x: x*x - 2,
+            input = dict(x0 = 1, x1 = 2),
+            type = 'Secant',
+            stop_diff = 1e-10,
+            print_interim = True,
+                    )
+    ================================================================================
+
+    "input"이 숫자 하나이면 x1 = x0*(1 + 1e-4) +- 1e-4로 시작한다.
+    Newton-Raphson처럼 시작점이 나쁘면 발산할 수 있다. (bracket이 있으면 Brent, Illinois를 사용하기)
+    result.csv; x, fn
+    """
+
+    def _change_format(self, val) -> np.ndarray:
+        """
+        직전 값(x_pre, fn_pre)은 속성으로 남긴다.
+        """
+        if isinstance(val, dict):
+            x0, x1 = float(val['x0']), float(val['x1'])
+        else:
+            x0 = float(val)
+            x1 = x0*(1 + 1e-4) + (1e-4 if x0 >= 0 else -1e-4)
+        assert x0 != x1, '"x0" and "x1" should be different.'
+        self.x_pre = x0
+        return np.array([x1, np.nan])
+
+    def _init_state(self, fn, record: np.ndarray) -> None:
+        self.fn_pre = fn(self.x_pre)
+        record[1] = fn(record[0])
+        self.n_fn_eval += 2
+
+    def _calculate_helper(self, fn, record: np.ndarray) -> np.ndarray:
+        x, fx = record
+        if fx == self.fn_pre: # converged (or flat). can not draw the secant line
+            return record
+        x_new = x - fx*(x - self.x_pre)/(fx - self.fn_pre)
+        self.x_pre, self.fn_pre = x, fx
+        fx_new = fn(x_new)
+        self.n_fn_eval += 1
+        return np.array([x_new, fx_new])
@@ -1,11 +1,19 @@
 from .builder import METHODS, build_operator
+import sys, os
+sys.path.append(os.path.dirname(os.path.abspath(os.path.dirname(__file__))))
+from utils.result_cache import ResultCache, UncacheableError
 
-def operate(cfg):
+def operate(cfg, use_cache: bool = True):
     """
     수치해석을 계산하는 메서드.
     config를 받아서
         1. 유효성 검사를 하고
         2. 지정된 method에 따라 계산 수행
+    계산이 끝난 method 객체를 반환한다. (결과는 .df)
+
+    같은 설정으로 계산한 결과가 result cache에 있으면 계산하지 않고 CachedRun을 반환한다.
+    "use_cache"가 False이거나 calculator의 "cache"가 False이면 cache를 사용하지 않는다. ("metrics"가 True이면 항상 계산한다.)
+    checkpoint에서 이어서 계산할 때("_resume")와 "dense_output"이 True일 때도 cache를 사용하지 않는다. (cache에는 result만 저장된다.)
     """
     cal = cfg.calculator
     is_iter = cal.get('iter_num') or cal.get('iter_num')==0
@@ -18,4 +26,22 @@ def operate(cfg):
         if cal.stop_diff < 0:
             print('"stop_diff" is set to positive. (calculate with absolute value)')
             cal.stop_diff = -cal.stop_diff
-    build_operator(cal)
\ No newline at end of file
+    if cal.get('checkpoint') is not None:
+        assert isinstance(cal.checkpoint, int) and cal.checkpoint > 0, '"checkpoint" should be a positive integer.'
+
+    method_cls = METHODS.get(cal.type) if isinstance(cal.type, str) else cal.type
+    if not (use_cache and cal.get('cache', True) and not cal.get('metrics', False) and not cal.get('_resume', False)
+            and not cal.get('dense_output', False) and method_cls is not None):
+        return build_operator(cal)
+
+    cache = ResultCache()
+    try:
+        key = cache.make_key(cfg, method_cls)
+    except UncacheableError: # e.g. fn uses an object which can not be pickled
+        return build_operator(cal)
+    hit = cache.load(key, cal)
+    if hit is not None:
+        return hit
+    method = build_operator(cal)
+    cache.store(key, method, cal._dir)
+    return method
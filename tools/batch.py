@@ -0,0 +1,113 @@
+"""
+여러 config 파일을 process pool로 한 번에 계산한다.
+    사용 예시;
+    $ python tools/batch.py ./configs
+    $ python tools/batch.py "./configs/newton_raphson*.py" --workers 4
+
+    logs/batch_년월일_시분초/ 아래에 config마다 log 폴더가 생기고
+    결과와 계산 시간은 summary.csv에 저장된다.
+    "sweep"이 있는 config는 variant마다 따로 계산한다. (utils/config.py의 Config.expand_sweep 참고)
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(os.path.dirname(__file__))))
+from utils.config import Config
+from utils.logging_sth import duplicate_config_file, make_log_folder
+from utils.result_cache import CachedRun
+from core.operate import operate
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+import argparse
+import glob
+import time
+import pandas as pd
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Analyze many configs by numerical method in parallel.')
+    parser.add_argument('configs', nargs='+', help='directories or glob patterns of python files containing the method configuration')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='number of worker processes (default: number of CPUs)')
+    parser.add_argument('--no-cache', action='store_true', help='calculate again without the result cache')
+    args = parser.parse_args()
+    return args
+
+def collect_config_files(patterns: list) -> list:
+    """
+    디렉토리이면 그 안의 *.py를, 아니면 glob pattern에 맞는 파일을 모은다.
+    """
+    files = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            files.extend(sorted(glob.glob(os.path.join(pattern, '*.py'))))
+        else:
+            files.extend(sorted(glob.glob(pattern)))
+    return list(dict.fromkeys(os.path.abspath(f) for f in files)) # remove duplicates, keep order
+
+def run_config(config_path: str, _dir: str, variant: int = 0, use_cache: bool = True) -> dict:
+    """
+    config 하나를 계산한다. (worker process에서 실행)
+    lambda는 pickle할 수 없으므로 worker에서 config 파일을 다시 읽고 "variant"번째 sweep variant를 계산한다.
+
+    Returns:
+        dict for a row of summary.csv
+    """
+    summary = dict(config=config_path, params=None, type=None, log_dir=_dir, status='done', cached=False, elapsed_sec=None, rows=None, result=None)
+    start = time.perf_counter()
+    try:
+        params, cfg = Config.fromfile(config_path).expand_sweep(index=variant)
+        summary['params'] = ', '.join(f'{k}={v}' for k, v in params.items())
+        summary['type'] = cfg.calculator.type
+        cfg.calculator._dir = _dir # 이후 logging에 사용
+        duplicate_config_file(cfg, _dir)
+        method = operate(cfg, use_cache=use_cache)
+        summary['cached'] = isinstance(method, CachedRun)
+        summary['rows'] = len(method.result)
+        summary['result'] = ', '.join(f'{k}={v:.6g}' if isinstance(v, float) else f'{k}={v}'
+                                      for k, v in method.result.last_row().items() if k != 'index')
+    except Exception as e:
+        summary['status'] = f'failed; {type(e).__name__}: {e}'
+    finally:
+        summary['elapsed_sec'] = time.perf_counter() - start
+    return summary
+
+def main():
+    args = parse_args()
+    assert args.workers > 0, '"--workers" should be a positive integer.'
+    config_files = collect_config_files(args.configs)
+    if not config_files:
+        print('config 파일을 찾지 못했습니다.')
+        sys.exit(1)
+
+    # set logging directory
+    current_time = datetime.now()
+    current_time = current_time.strftime("%y%m%d_%H%M%S")
+    batch_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), f'logs/batch_{current_time}') + '/'
+    make_log_folder(batch_dir)
+
+    # (config path, sweep variant index) for each run
+    runs = []
+    for path in config_files:
+        n_variant = Config.fromfile(path).n_variants()
+        runs.extend((path, variant, n_variant) for variant in range(n_variant))
+
+    # do operate in parallel. each run has its own log directory.
+    start = time.perf_counter()
+    summaries = []
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        futures = []
+        for i, (path, variant, n_variant) in enumerate(runs):
+            name = os.path.splitext(os.path.basename(path))[0]
+            if n_variant > 1:
+                name += f'_{variant:04d}'
+            futures.append(executor.submit(run_config, path, batch_dir + f'{i:04d}_{name}/', variant, not args.no_cache))
+        for future in as_completed(futures):
+            summaries.append(future.result())
+    elapsed = time.perf_counter() - start
+
+    summary = pd.DataFrame(summaries).sort_values('log_dir').reset_index(drop=True)
+    summary.to_csv(batch_dir + 'summary.csv', encoding='utf-8')
+    print(summary[['config', 'params', 'type', 'status', 'cached', 'elapsed_sec', 'result']].to_string())
+    print(f'{len(summary)} runs, {(summary.status == "done").sum()} done in {elapsed:.3f} sec with {args.workers} workers. -> {batch_dir}summary.csv')
+
+if __name__ == '__main__':
+    main()
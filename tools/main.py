@@ -3,6 +3,7 @@ import os
 sys.path.append(os.path.dirname(os.path.abspath(os.path.dirname(__file__))))
 from utils.config import Config
 from utils.logging_sth import duplicate_config_file
+from utils.checkpoint import has_checkpoint, find_config_file
 from core.operate import operate
 from datetime import datetime
 import argparse
@@ -21,13 +22,36 @@ class ArgumentParser_ChangeErrorMessage(argparse.ArgumentParser):
 
 def parse_args():
     parser = ArgumentParser_ChangeErrorMessage(description='Analyze by numerical method.')
-    parser.add_argument('config', help='path of a python file containing the specific method configuration')
+    parser.add_argument('config', nargs='?', help='path of a python file containing the specific method configuration')
+    parser.add_argument('--no-cache', action='store_true', help='calculate again without the result cache')
+    parser.add_argument('--resume', metavar='LOG_DIR', help='continue an interrupted run from the last checkpoint in its log directory')
     args = parser.parse_args()
+    if args.config is None and args.resume is None:
+        parser.error('the following arguments are required: config')
     return args
 
+def resume(args):
+    """
+    중단된 계산을 log 폴더의 checkpoint에서 이어서 계산한다. (utils/checkpoint.py 참고)
+    config 파일을 주지 않으면 log 폴더에 복사된 config 파일을 사용한다.
+    """
+    _dir = os.path.join(os.path.abspath(args.resume), '')
+    cfg = Config.fromfile(args.config or find_config_file(_dir))
+    cfg.calculator._dir = _dir
+    if has_checkpoint(_dir):
+        cfg.calculator._resume = True
+    else:
+        print(f'There is no checkpoint in {_dir}. Calculate from the beginning.')
+    operate(cfg, use_cache=False)
+
 def main():
     args = parse_args()
+    if args.resume is not None:
+        resume(args)
+        return
     cfg = Config.fromfile(args.config)
+    if 'sweep' in cfg.cfg_dict:
+        print('"sweep" is calculated only by tools/batch.py. Calculate without "sweep".')
 
     # set logging directory
     current_time = datetime.now()
@@ -37,7 +61,7 @@ def main():
     duplicate_config_file(cfg, _dir)
 
     # do operate
-    operate(cfg)
+    operate(cfg, use_cache=not args.no_cache)
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
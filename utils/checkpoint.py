@@ -0,0 +1,83 @@
+"""
+HOW TO USE
+
+오래 걸리는 계산이 중단되어도 이어서 계산할 수 있도록 "checkpoint" iteration마다 상태를 log 폴더에 저장한다.
+    calculator에 checkpoint = 100000을 적으면 100000 iteration마다 저장한다. (interval이 클수록 I/O 비용이 작다.)
+    예시)
+        >>> calculator = dict(
+        >>>     ...
+        >>>     iter_num = 10000000,
+        >>>     checkpoint = 100000,
+        >>>             )
+
+    이어서 계산하기; 중단된 계산의 log 폴더를 지정한다. (log 폴더에 복사된 config 파일로 계산한다.)
+        $ python tools/main.py --resume logs/Runge_Kutta_230801_120000/
+
+    log 폴더에 저장되는 것;
+        checkpoint.pkl : iteration 횟수(cnt), val, pre_val, method 객체의 속성 중 함수와 logger가 아닌 값들,
+                         checkpoint_buffers의 snapshot (TrajectoryBuffer.snapshot), log_interim.txt의 크기
+        checkpoint_<name>.npy : checkpoint_buffers (result, Runge_Kutta dense output의 stages)에 지금까지 저장한 행.
+                                지난 checkpoint 이후의 행만 이어 쓰므로 I/O는 새 행의 개수에 비례한다. (result는 "stream_chunk"가 없을 때)
+    이어서 계산할 때 result 파일과 log_interim.txt를 checkpoint 때의 크기로 자르고 이어 쓰므로
+    중단되지 않은 계산과 같은 결과가 나온다. 계산이 끝나면 checkpoint 파일들은 지운다.
+
+    주의)
+        - "jit"으로 계산하면 checkpoint를 저장하지 않는다. (이어서 계산할 때는 "jit"을 사용하지 않는다.)
+        - metrics.json에는 이어서 계산한 부분만 기록된다.
+"""
+
+import glob
+import os
+import os.path as osp
+import pickle
+
+CHECKPOINT_FILE = 'checkpoint.pkl'
+
+def buffer_file(name:str) -> str:
+    """
+    method의 TrajectoryBuffer 속성 "name"의 행을 저장하는 파일 이름. (e.g. checkpoint_result.npy)
+    """
+    return f'checkpoint_{name}.npy'
+
+def save_checkpoint(_dir:str, state:dict) -> None:
+    """
+    임시 파일에 쓴 후 바꾸므로 쓰는 도중에 중단되어도 이전 checkpoint가 남는다.
+    """
+    path = osp.join(_dir, CHECKPOINT_FILE)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+def load_checkpoint(_dir:str) -> dict:
+    with open(osp.join(_dir, CHECKPOINT_FILE), 'rb') as f:
+        return pickle.load(f)
+
+def has_checkpoint(_dir:str) -> bool:
+    return osp.isfile(osp.join(_dir, CHECKPOINT_FILE))
+
+def remove_checkpoint(_dir:str) -> None:
+    """
+    계산이 끝나면 checkpoint 파일들을 지운다.
+    """
+    paths = [osp.join(_dir, name) for name in (CHECKPOINT_FILE, CHECKPOINT_FILE + '.tmp')]
+    for path in paths + glob.glob(osp.join(_dir, buffer_file('*'))):
+        if osp.exists(path):
+            os.remove(path)
+
+def truncate_file(path:str, size:int) -> None:
+    """
+    checkpoint 이후에 쓴 내용을 지운다. (e.g. log_interim.txt)
+    """
+    if osp.exists(path):
+        os.truncate(path, size)
+
+def find_config_file(_dir:str) -> str:
+    """
+    log 폴더에 복사된 config 파일(utils/logging_sth.py의 duplicate_config_file)을 찾는다.
+    """
+    files = sorted(glob.glob(osp.join(_dir, '*.py')))
+    assert len(files) == 1, f'Expected one config file in {_dir}, but found {len(files)}. Give the config file too.'
+    return files[0]
@@ -24,7 +24,18 @@ HOW TO USE
         >>> cfg = Config.fromfile(cfg_path)
         >>> operate(cfg) # ConfigDict 객체 전달
 
-3. 쿼리 형식으로 사용
+3. (선택) config 파일에 "sweep"을 작성하면 calculator의 variant들로 펼쳐서 계산 (tools/batch.py)
+    예시)
+        >>> calculator = dict(fn = lambda x: x*x - A, input = 1, ...)
+        >>> sweep = dict(
+        >>>     mode = 'product',                            # 'product' or 'zip'
+        >>>     params = {'input' : [1, 10], 'A' : [2, 3]},  # calculator의 key ('input.distance'처럼 .으로 구분) 또는 fn이 쓰는 상수
+        >>>               )
+        >>> variants = Config.fromfile(cfg_path).expand_sweep() # [(params, Config), ...] 4개
+        >>> Config.fromfile(cfg_path).n_variants()               # 4 (variant를 만들지 않고 센다)
+        >>> params, cfg = Config.fromfile(cfg_path).expand_sweep(index=2) # 2번째 variant만 만든다
+
+4. 쿼리 형식으로 사용
     예시)
         [위 예시의 operate가 정의된 파일]에서
         @ numerical_method_v2/core/operate.py
@@ -33,14 +44,13 @@ HOW TO USE
         >>>     ...
 """
 
-import ast
+import builtins
+import copy
+import hashlib
+import itertools
+import os
 import os.path as osp
-import tempfile
-import platform
-import shutil
-import sys
 import types
-from importlib import import_module
 from pathlib import Path
 from addict import Dict
 
@@ -62,53 +72,48 @@ class ConfigDict(Dict):
 
 class Config:
 
+    # compiled code of config files; {filename: (mtime_ns, sha1 of the content, code)}
+    _code_cache = {}
+
     @staticmethod
-    def _validate_py_syntax(filename):
-        with open(filename, encoding='utf-8') as f:
-          # Setting encoding explicitly to resolve coding issue on windows
-            content = f.read()
+    def _compile(filename, content: bytes):
+        """
+        config 파일을 compile한다. 같은 파일의 mtime과 내용의 hash가 같으면 cache된 code를 사용한다.
+        """
+        mtime = os.stat(filename).st_mtime_ns
+        digest = hashlib.sha1(content).hexdigest()
+        cached = Config._code_cache.get(filename)
+        if cached is not None and cached[0] == mtime and cached[1] == digest:
+            return cached[2]
         try:
-            ast.parse(content)
+            code = compile(content, filename, 'exec')
         except SyntaxError as e:
             raise SyntaxError(f'There are syntax errors in config file {filename}: {e}')
+        Config._code_cache[filename] = (mtime, digest, code)
+        return code
 
     @staticmethod
     def _file2dict(filename):
         filename = osp.abspath(osp.expanduser(filename)) # 절대경로로 바꿔준다.
-        fileExtname = osp.splitext(filename)[1] # split extension. 확장자 알려주는 함수
-
-        with tempfile.TemporaryDirectory() as temp_config_dir:
-            temp_config_file = tempfile.NamedTemporaryFile(dir=temp_config_dir, suffix=fileExtname)
-            if platform.system() == 'Windows': temp_config_file.close()
-            temp_config_name = osp.basename(temp_config_file.name) # 임시파일의 이름 (random name)
-            shutil.copyfile(filename, temp_config_file.name) # config 파일 경로인 filename 내용을 임시파일로 복사
-
-            if filename.endswith('.py'):
-                temp_module_name = osp.splitext(temp_config_name)[0]
-              # 임시파일을 모듈로 import하기
-                sys.path.insert(0, temp_config_dir)
-                Config._validate_py_syntax(filename)
-                mod = import_module(temp_module_name)
-                sys.path.pop(0)
-                
-                cfg_dict = {
-                    name: value
-                    for name, value in mod.__dict__.items()
-                  # 저작권 메시지 출력 삭제 (이 코드가 없을 때 왜 저작권 메시지가 뜨는지는 모르겠다)
-                    if not name.startswith('__')
-                    and not isinstance(value, types.ModuleType)
-                    and not isinstance(value, types.FunctionType)                    
-                }
-
-              # delete imported module
-                del sys.modules[temp_module_name]
-          # close temp file
-            temp_config_file.close()
-
-        # cfg_text = filename + '\n\n'
-        cfg_text = ''
-        with open(filename, encoding='utf-8') as f:
-            cfg_text += f.read() # cfg_text에 config 파일 이름과 내용이 들어간다
+        if not filename.endswith('.py'):
+            raise IOError('Only py type is supported now!')
+
+        with open(filename, 'rb') as f:
+            content = f.read()
+
+      # 임시파일로 복사해서 import하지 않고 compile한 code를 새 namespace에서 바로 실행하기
+        namespace = {'__name__': osp.splitext(osp.basename(filename))[0], '__file__': filename, '__builtins__': builtins}
+        exec(Config._compile(filename, content), namespace)
+
+        cfg_dict = {
+            name: value
+            for name, value in namespace.items()
+            if not name.startswith('__')
+            and not isinstance(value, types.ModuleType)
+            and not isinstance(value, types.FunctionType)
+        }
+
+        cfg_text = content.decode('utf-8').replace('\r\n', '\n') # cfg_text에 config 파일 내용이 들어간다
         return cfg_dict, cfg_text
 
     @staticmethod
@@ -131,6 +136,104 @@ class Config:
         self._cfg_dict = ConfigDict(cfg_dict)와 같은 기능을 하지만 https://alphahackerhan.tistory.com/44 (지연 속성)를 보니 무한 참조 오류가 나올 수도 있을 것 같다.
         """
 
+    @staticmethod
+    def _rebind_constants(fn, constants: dict):
+        """
+        fn이 사용하는 module 상수(globals)를 constants로 바꾼 새 함수를 만든다.
+        """
+        fn_globals = {**fn.__globals__, **constants}
+        new_fn = types.FunctionType(fn.__code__, fn_globals, fn.__name__, fn.__defaults__, fn.__closure__)
+        new_fn.__kwdefaults__ = fn.__kwdefaults__
+        return new_fn
+
+    def _sweep_params(self):
+        """
+        "sweep"의 params 이름들과 값의 조합 iterator, variant 개수를 반환한다. (config는 복사하지 않는다.)
+        """
+        sweep = self.cfg_dict['sweep']
+        mode = sweep.get('mode', 'product')
+        names = list(sweep['params'])
+        values = [sweep['params'][name] for name in names]
+        if mode == 'product':
+            n_variants = 1
+            for v in values:
+                n_variants *= len(v)
+            return names, itertools.product(*values), n_variants
+        if mode == 'zip':
+            assert len(set(len(v) for v in values)) == 1, 'Every value of "params" should have the same length for "zip".'
+            return names, zip(*values), len(values[0]) if values else 0
+        raise ValueError(f'"mode" of sweep must be "product" or "zip", but got {mode}')
+
+    def n_variants(self) -> int:
+        """
+        expand_sweep이 만드는 variant의 개수. variant를 만들지 않고 센다.
+        """
+        if self.cfg_dict.get('sweep') is None:
+            return 1
+        return self._sweep_params()[2]
+
+    def expand_sweep(self, index:int=None):
+        """
+        "sweep"에 적힌 params로 calculator의 variant들을 만든다.
+            mode = 'product' : 모든 조합 (Cartesian product)
+            mode = 'zip'     : 같은 순서끼리 묶기
+            params의 key가
+                calculator의 key이면 ('input', 'input.distance', 'iter_num', ...) 그 값을 바꾸고
+                calculator의 "constants"에 있으면 (fn이 문자열일 때) 그 값을 바꾸고
+                아니면 fn이 사용하는 상수로 보고 fn(과 dfn 등)의 globals를 바꾼다.
+                (상수로 계산된 다른 상수는 다시 계산되지 않으니 fn이 직접 쓰는 상수를 적기)
+
+        Args:
+            index : 주면 "index"번째 variant 하나만 만든다. (e.g. tools/batch.py의 worker)
+
+        Returns:
+            list of (params, Config). "sweep"이 없으면 [({}, self)]
+            index를 주면 (params, Config) 하나
+        """
+        if self.cfg_dict.get('sweep') is None:
+            if index is None:
+                return [({}, self)]
+            assert index == 0, f'There is only one variant without "sweep", but got index {index}.'
+            return {}, self
+
+        names, combinations, n_variants = self._sweep_params()
+        if index is None:
+            return [self._make_variant(dict(zip(names, combination))) for combination in combinations]
+        assert 0 <= index < n_variants, f'"index" should be in [0, {n_variants}), but got {index}.'
+        combination = next(itertools.islice(combinations, index, None))
+        return self._make_variant(dict(zip(names, combination)))
+
+    def _make_variant(self, params: dict):
+        """
+        params로 값을 바꾼 calculator의 (params, Config)를 만든다.
+        """
+        cfg_dict = copy.deepcopy({k: v for k, v in self.cfg_dict.items() if k != 'sweep'})
+        calculator = cfg_dict['calculator']
+        constants = {}
+        for name, value in params.items():
+            keys = name.split('.')
+            if keys[0] not in calculator and name in calculator.get('constants', {}):
+                calculator['constants'][name] = value # constant of an expression string "fn"
+                continue
+            if keys[0] not in calculator:
+                constants[name] = value
+                if name in cfg_dict:
+                    cfg_dict[name] = value
+                continue
+            target = calculator
+            for key in keys[:-1]:
+                target = target[key]
+            target[keys[-1]] = value
+
+        if constants:
+            fns = {k: v for k, v in calculator.items() if isinstance(v, types.FunctionType)}
+            for name in constants:
+                if not any(name in fn.__code__.co_names for fn in fns.values()):
+                    raise KeyError(f'"{name}" of sweep is neither a key of calculator nor a constant used by its functions')
+            for k, fn in fns.items():
+                calculator[k] = Config._rebind_constants(fn, constants)
+        return params, Config(cfg_dict, cfg_text=self.cfg_text)
+
     # cfg.model.type과 같은 형식을 사용할 수 있게 해주는 코드
     def __getattr__(self, name):
         return getattr(self._cfg_dict, name)
@@ -1,6 +1,9 @@
 # https://docs.python.org/3/library/logging.html
 
+import atexit
 import logging
+import queue
+import threading
 from logging import handlers as loghdlrs
 from contextlib import contextmanager
 import datetime as dt
@@ -94,6 +97,31 @@ class DisableLogger:
     def __exit__(self, exit_type, exit_value, exit_traceback):
        logging.disable(logging.NOTSET)
 
+class _DeferredQueueHandler(loghdlrs.QueueHandler):
+    """
+    QueueHandler.prepare는 호출한 thread에서 message를 format하고 record를 복사한다.
+    이미 완성된 message (args, exc_info가 없는 f-string)는 그대로 queue에 넣어 format을 listener thread에서 한다.
+    """
+    def prepare(self, record:logging.LogRecord) -> logging.LogRecord:
+        if record.args or record.exc_info or record.stack_info:
+            return super().prepare(record) # args can be changed before the listener formats them
+        return record
+
+class _FlushableQueueListener(loghdlrs.QueueListener):
+    """
+    queue에 넣은 marker를 처리하면 알려준다. (thread를 멈추지 않고 앞의 log를 모두 출력했는지 기다린다.)
+    """
+    def handle(self, record) -> None:
+        if isinstance(record, threading.Event):
+            record.set()
+        else:
+            super().handle(record)
+
+    def wait_until_handled(self) -> None:
+        marker = threading.Event()
+        self.queue.put_nowait(marker)
+        marker.wait()
+
 class CustomLogger:
     # https://data-newbie.tistory.com/248   https://hwangheek.github.io/2019/python-logging/
     """
@@ -111,6 +139,9 @@ class CustomLogger:
         - 발생한 예외를 suppress하고 raise 하지 않은 경우 (e.g. long-running 서버 프로세스에서 에러 발생 시)
             logging.error(), logging.exception(), logging.critical()
 
+    logging.getLogger는 같은 이름이면 같은 logger를 반환하므로 사용이 끝나면 close()로 handler를 닫는다.
+    (with 구문을 사용해도 된다.)
+
     Example:
         from time import sleep
 
@@ -132,7 +163,7 @@ class CustomLogger:
                 break
     """
 
-    def __init__(self, name:str=None, propagate:bool=False) -> None:
+    def __init__(self, name:str=None, propagate:bool=False, use_queue:bool=False) -> None:
         """
         Args:
             name: for hierarchical logging
@@ -141,6 +172,10 @@ class CustomLogger:
                     logging.getLogger('A')
                     logging.getLogger('A.B')
                     logging.getLogger('A.B.C')
+            use_queue: True이면 logger에는 QueueHandler만 달고, 추가한 handler들은 QueueListener의 background thread에서 실행한다.
+                console, 파일 I/O를 기다리지 않는다. message의 format도 listener thread에서 한다.
+                (GIL을 같이 쓰므로 I/O가 느릴 때만 빨라진다. 그렇지 않으면 queue 때문에 조금 느리다.)
+                flush()로 지금까지의 log를 모두 쓰고, 프로그램이 끝날 때(atexit) 자동으로 stop_queue()가 호출된다.
         """
         self.logger = logging.getLogger(name)
         self.logger.setLevel('DEBUG')
@@ -151,6 +186,9 @@ class CustomLogger:
           # 자식 로거에서 핸들러 설정을 해주고 싶으면 False로.
           # (True로 하면 로거가 부모, 자식 핸들러에서 중복으로 처리된다.)
         self.formatter = None
+        self.use_queue = use_queue
+        self.queue_listener = None
+        self.is_listening = False # True while the thread of queue_listener runs
     
     def get_logger(self) -> logging.Logger:
         return self.logger
@@ -213,8 +251,66 @@ class CustomLogger:
         if fmt or datefmt:
             self.formatter = logging.Formatter(fmt=fmt, datefmt=datefmt)
             handler.setFormatter(self.formatter)
-        self.logger.addHandler(handler)
+        if self.use_queue:
+            self._add_queued_handler(handler)
+        else:
+            self.logger.addHandler(handler)
         return self.logger
+
+    def _add_queued_handler(self, handler:logging.Handler) -> None:
+        """
+        처음 호출될 때 QueueHandler를 logger에 달고 QueueListener를 시작한다.
+        이후의 handler는 listener에 추가된다.
+        """
+        if self.queue_listener is None:
+            log_queue = queue.SimpleQueue()
+            self.logger.addHandler(_DeferredQueueHandler(log_queue))
+            self.queue_listener = _FlushableQueueListener(log_queue, handler, respect_handler_level=True)
+            self.queue_listener.start()
+            self.is_listening = True
+            atexit.register(self.stop_queue) # flush on exit
+        else:
+            self.queue_listener.handlers = self.queue_listener.handlers + (handler,)
+
+    def flush(self) -> None:
+        """
+        지금까지 남긴 log를 모두 출력한다. (use_queue이면 queue가 빌 때까지 기다린다.)
+        """
+        if self.is_listening:
+            self.queue_listener.wait_until_handled()  # every record put before is processed
+        handlers = self.queue_listener.handlers if self.queue_listener is not None else self.logger.handlers
+        for handler in handlers:
+            handler.flush()
+
+    def stop_queue(self) -> None:
+        """
+        queue의 log를 모두 출력하고 QueueListener의 thread를 멈춘다.
+        """
+        if self.is_listening:
+            self.queue_listener.stop()
+            self.is_listening = False
+
+    def close(self) -> None:
+        """
+        logger의 handler를 모두 떼어내고 닫는다. (파일도 닫힌다.)
+        logging.getLogger는 같은 이름이면 같은 logger를 반환하므로,
+        계산이 끝날 때 호출해야 같은 process의 다음 계산에서 handler가 쌓이지 않는다.
+        """
+        self.stop_queue()
+        handlers = list(self.logger.handlers)
+        if self.queue_listener is not None:
+            handlers += list(self.queue_listener.handlers)
+            atexit.unregister(self.stop_queue)
+            self.queue_listener = None
+        for handler in handlers:
+            self.logger.removeHandler(handler)
+            handler.close()
+
+    def __enter__(self) -> 'CustomLogger':
+        return self
+
+    def __exit__(self, exit_type, exit_value, exit_traceback) -> None:
+        self.close()
     
     def add_stream_handler(self, level:str='WARNING', fmt=None, datefmt=None) -> 'CustomLogger':
         """
@@ -24,6 +24,6 @@ def duplicate_config_file(cfg: Config, _dir):
     logger = CustomLogger('duplicate_config_file')
     name = cfg.cfg_dict['calculator']['type']
     make_log_folder(_dir)
-    logger.add_file_handler(level='INFO', filename=_dir+f'{name}_{current_time}.py')
-    logger = logger.get_logger()
-    logger.info(cfg.cfg_text)
+    with logger:
+        logger.add_file_handler(level='INFO', filename=_dir+f'{name}_{current_time}.py')
+        logger.get_logger().info(cfg.cfg_text)
@@ -0,0 +1,174 @@
+"""
+HOW TO USE
+
+계산 단계(phase)별 시간, fn 계산 횟수, iteration 횟수, 수렴 속도를 측정해서 log 폴더의 metrics.json에 저장한다.
+    calculator에 metrics = True를 적으면 측정한다. (False이면 측정 코드를 거치지 않는다.)
+    예시)
+        >>> calculator = dict(
+        >>>     fn = lambda x: x*x - 2,
+        >>>     ...
+        >>>     metrics = True,
+        >>>             )
+
+    metrics.json;
+        total_sec : 계산 전체 시간 (logger 설정 제외)
+        phases : {phase: {sec, calls}}. phase끼리 겹칠 수 있다. (calculate_helper의 시간에 fn의 시간이 포함된다.)
+        counters : iterations, fn_calls, fn_points(배열이면 원소 개수) 와 method마다의 값
+        convergence : 마지막 iteration들의 |val - pre_val| (step), 비율(ratio = step_k / step_k-1)과 수렴 차수(order) 추정값
+"""
+
+import functools
+import json
+import math
+import time
+import numpy as np
+from core.methods.ode.dual_number import Dual
+
+_POINT_TYPES = (np.ndarray, Dual)
+
+def count_points(args) -> int:
+    """
+    fn 한 번에 계산한 점의 개수. ndarray (Dual이면 val)의 원소 개수 중 가장 큰 값, 모두 scalar이면 1.
+    scalar에는 isinstance 검사만 하므로 매 fn 호출마다 사용해도 된다. (benchmarks/run.py의 CountingFn도 사용)
+    """
+    points = 1
+    for arg in args:
+        if isinstance(arg, _POINT_TYPES):
+            size = arg.size if isinstance(arg, np.ndarray) else np.size(arg.val)
+            if size > points:
+                points = size
+    return points
+
+class RunMetrics:
+
+    # number of the last steps kept for convergence statistics
+    n_steps = 10
+
+    def __init__(self) -> None:
+        self.phases = {}
+        self.counters = dict(iterations=0, fn_calls=0, fn_points=0)
+        self.steps = []
+        self.total_sec = None
+
+    def add(self, phase: str, sec: float, calls: int = 1) -> None:
+        entry = self.phases.get(phase)
+        if entry is None:
+            entry = self.phases[phase] = [0.0, 0]
+        entry[0] += sec
+        entry[1] += calls
+
+    def timed(self, phase: str, method):
+        """
+        method를 호출할 때마다 시간을 더하는 함수를 반환한다.
+        """
+        perf_counter = time.perf_counter
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self.add(phase, perf_counter() - start)
+        return wrapper
+
+    def counted_fn(self, fn):
+        """
+        fn의 호출 횟수, 계산한 점의 개수, 시간을 센다. 원래 fn은 __wrapped__에 남는다. (jit은 원래 fn을 compile한다.)
+        세는 시간도 "fn"의 시간에 포함된다. (calculate_helper의 시간에서 wrapper의 시간을 뺄 수 있도록)
+        """
+        perf_counter = time.perf_counter
+        counters = self.counters
+        entry = self.phases.setdefault('fn', [0.0, 0])
+        @functools.wraps(fn)
+        def wrapper(*args):
+            start = perf_counter()
+            try:
+                counters['fn_calls'] += 1
+                counters['fn_points'] += count_points(args)
+                return fn(*args)
+            finally:
+                entry[0] += perf_counter() - start
+                entry[1] += 1
+        return wrapper
+
+    def tracked_helper(self, helper, project=None):
+        """
+        _calculate_helper의 시간과 |val - pre_val|을 기록한다. (val이 그 자리에서 갱신되어도 되도록 pre_val을 복사한다.)
+
+        Args:
+            project : val에서 수렴을 볼 값을 꺼내는 함수. (e.g. Dormand_Prince는 y만)
+        """
+        project = project or (lambda val: val)
+        perf_counter = time.perf_counter
+        steps = self.steps
+        @functools.wraps(helper)
+        def wrapper(fn, val):
+            pre_val = _copy(project(val))
+            start = perf_counter()
+            try:
+                new_val = helper(fn, val)
+            finally:
+                self.add('calculate_helper', perf_counter() - start)
+            steps.append(_step(project(new_val), pre_val))
+            if len(steps) > 2 * self.n_steps:
+                del steps[:-self.n_steps]
+            return new_val
+        return wrapper
+
+    def convergence(self) -> dict:
+        steps = self.steps[-self.n_steps:]
+        ratio = order = None
+        positive = [math.isfinite(step) and step > 0 for step in steps]
+        if len(steps) >= 2 and positive[-2] and math.isfinite(steps[-1]):
+            ratio = steps[-1] / steps[-2]
+        if len(steps) >= 3 and all(positive[-3:]) and steps[-2] != steps[-3]:
+            # |e_k+1| ~ C |e_k|^q  ->  q ~ log(e_k+1/e_k) / log(e_k/e_k-1)
+            order = math.log(steps[-1] / steps[-2]) / math.log(steps[-2] / steps[-3])
+        return dict(last_steps=[step if math.isfinite(step) else None for step in steps], ratio=ratio, order=order)
+
+    def to_dict(self, method_name: str) -> dict:
+        return dict(
+            method=method_name,
+            total_sec=self.total_sec,
+            phases={name: dict(sec=sec, calls=calls) for name, (sec, calls) in self.phases.items()},
+            counters=self.counters,
+            convergence=self.convergence(),
+        )
+
+    def save(self, path: str, method_name: str) -> None:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(method_name), f, indent=2, default=_to_builtin)
+
+def _copy(val):
+    if isinstance(val, np.ndarray):
+        return val.copy()
+    if isinstance(val, list):
+        return [_copy(v) for v in val]
+    return val
+
+def _step(val, pre_val) -> float:
+    """
+    max |val - pre_val|. 계산할 수 없으면 nan.
+    scalar와 scalar의 list (e.g. Runge_Kutta의 [x, y])는 ndarray를 만들지 않고 계산한다.
+    """
+    if isinstance(val, float) and isinstance(pre_val, float):
+        diff = abs(val - pre_val)
+        return float(diff) if math.isfinite(diff) else math.nan
+    if isinstance(val, list) and isinstance(pre_val, list) and len(val) == len(pre_val) \
+            and all(isinstance(v, float) for v in val) and all(isinstance(v, float) for v in pre_val):
+        diffs = [abs(v - p) for v, p in zip(val, pre_val)]
+        diffs = [d for d in diffs if math.isfinite(d)]
+        return float(max(diffs)) if diffs else math.nan
+    try:
+        diff = np.abs(np.asarray(val, dtype=np.float64) - np.asarray(pre_val, dtype=np.float64))
+    except (TypeError, ValueError):
+        return math.nan
+    diff = diff[np.isfinite(diff)]
+    return float(diff.max()) if diff.size else math.nan
+
+def _to_builtin(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
@@ -0,0 +1,195 @@
+"""
+HOW TO USE
+
+같은 calculator 설정으로 다시 계산하지 않도록 결과를 cache한다.
+    key : config 파일 내용(cfg_text), method 이름과 version, calculator 값들(fn의 bytecode와 fn이 쓰는 상수 포함)의 hash
+    value : result.npy (trajectory), log_result.txt
+
+    예시)
+        @ numerical_method_v2/core/operate.py
+        >>> cache = ResultCache()
+        >>> key = cache.make_key(cfg, method_cls)
+        >>> hit = cache.load(key, cal)      # 있으면 CachedRun, 없으면 None
+        >>> if hit is None:
+        >>>     method = build_operator(cal)
+        >>>     cache.store(key, method, cal._dir)
+
+    cache 사용하지 않기; calculator에 cache = False 또는 $ python tools/main.py config.py --no-cache
+    calculator 값(fn이 쓰는 전역 값 포함)을 pickle할 수 없으면 cache를 사용하지 않고 계산한다.
+    cache가 max_bytes보다 커지면 가장 오래 사용하지 않은 결과부터 지운다. (LRU)
+    읽을 수 없는 cache (깨진 result.npy, log_result.txt)는 지우고 다시 계산한다.
+"""
+
+import hashlib
+import json
+import marshal
+import os
+import os.path as osp
+import pickle
+import shutil
+import tempfile
+import types
+import numpy as np
+from .logging_custom import CustomLogger
+from .trajectory import TrajectoryBuffer, check_output_format
+
+DEFAULT_CACHE_DIR = osp.join(osp.dirname(osp.dirname(osp.abspath(__file__))), '.result_cache')
+
+# calculator keys which do not change the result
+IGNORED_KEYS = ('_dir', 'print_interim', 'log_queue', 'output_format', 'stream_chunk', 'cache', 'checkpoint', '_resume')
+
+# values whose repr is their whole content
+_EXACT_REPR_TYPES = (type(None), bool, int, float, complex, str, bytes, np.generic)
+# values identified by the name where they are defined. (e.g. math.sin, np.sin, a class)
+_NAMED_TYPES = (types.BuiltinFunctionType, np.ufunc, type)
+
+class UncacheableError(Exception):
+    """
+    calculator 값의 내용을 정확히 hash할 수 없다. operate는 cache를 사용하지 않고 계산한다.
+    """
+    pass
+
+def fingerprint(value, _seen=None):
+    """
+    hash할 수 있도록 값을 json으로 바꿀 수 있는 형태로 만든다.
+    함수는 bytecode, default, closure와 함수가 사용하는 전역 값까지 포함한다. (sweep으로 바뀐 상수도 반영된다.)
+    그 외의 객체(e.g. pandas)는 repr이 내용을 다 보여주지 않으므로 pickle한 bytes의 hash를 사용한다.
+    pickle할 수 없으면 UncacheableError가 발생한다.
+    """
+    _seen = set() if _seen is None else _seen
+    if isinstance(value, types.FunctionType):
+        if id(value) in _seen: # recursive function
+            return ['function', value.__qualname__]
+        _seen.add(id(value))
+        code = value.__code__
+        used_globals = {name: fingerprint(value.__globals__[name], _seen) for name in code.co_names if name in value.__globals__}
+        closure = [fingerprint(cell.cell_contents, _seen) for cell in value.__closure__ or ()]
+        return ['function', marshal.dumps(code).hex(), used_globals, closure, fingerprint(value.__defaults__, _seen)]
+    if isinstance(value, types.ModuleType):
+        return ['module', value.__name__]
+    if isinstance(value, dict):
+        return {str(k): fingerprint(v, _seen) for k, v in sorted(value.items(), key=lambda kv: str(kv[0]))}
+    if isinstance(value, (list, tuple)):
+        return [fingerprint(v, _seen) for v in value]
+    if isinstance(value, np.ndarray):
+        return ['ndarray', str(value.dtype), list(value.shape), hashlib.sha1(np.ascontiguousarray(value).tobytes()).hexdigest()]
+    if isinstance(value, _EXACT_REPR_TYPES):
+        return repr(value)
+    if isinstance(value, _NAMED_TYPES):
+        return ['named', getattr(value, '__module__', None), getattr(value, '__qualname__', getattr(value, '__name__', repr(value)))]
+    try:
+        data = pickle.dumps(value, protocol=4)
+    except Exception as e:
+        raise UncacheableError(f'{type(value).__name__} can not be fingerprinted; {e}') from e
+    return ['pickle', type(value).__qualname__, hashlib.sha1(data).hexdigest()]
+
+class CachedRun:
+    """
+    cache에서 읽은 계산 결과. operate가 method 객체 대신 반환한다.
+    """
+    def __init__(self, key:str, result:TrajectoryBuffer, result_log:str) -> None:
+        self.key = key
+        self.result = result
+        self.result_log = result_log
+
+    @property
+    def df(self):
+        return self.result.to_dataframe()
+
+class ResultCache:
+
+    def __init__(self, cache_dir:str=DEFAULT_CACHE_DIR, max_bytes:int=1 << 30) -> None:
+        """
+        Args:
+            cache_dir : cache를 저장할 폴더
+            max_bytes : cache 전체의 최대 크기. 넘으면 가장 오래 사용하지 않은 결과부터 지운다.
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    def make_key(self, cfg, method_cls) -> str:
+        """
+        Args:
+            cfg : Config
+            method_cls : calculator.type의 class. (version이 key에 포함된다.)
+
+        Raises:
+            UncacheableError : calculator에 hash할 수 없는 값이 있을 때
+        """
+        cal = {k: v for k, v in cfg.calculator.items() if k not in IGNORED_KEYS}
+        content = [cfg.cfg_text, method_cls.__name__, getattr(method_cls, 'version', 0), fingerprint(cal)]
+        return hashlib.sha256(json.dumps(content, sort_keys=True).encode('utf-8')).hexdigest()
+
+    def _entry_dir(self, key:str) -> str:
+        return osp.join(self.cache_dir, key)
+
+    def load(self, key:str, inputs):
+        """
+        cache가 있으면 결과 파일과 log_result.txt를 inputs._dir에 다시 만들고 CachedRun을 반환한다.
+
+        Returns:
+            CachedRun or None. 깨진 cache (e.g. 쓰는 도중에 중단된 파일)는 지우고 None을 반환한다.
+        """
+        entry = self._entry_dir(key)
+        if not osp.isdir(entry):
+            return None
+        try:
+            result = TrajectoryBuffer.from_structured(np.load(osp.join(entry, 'result.npy')))
+            with open(osp.join(entry, 'log_result.txt'), encoding='utf-8') as f:
+                result_log = f.read()
+        except (OSError, ValueError, EOFError, TypeError, KeyError, IndexError):
+            shutil.rmtree(entry, ignore_errors=True)
+            return None
+        os.utime(entry) # for LRU
+
+        for fmt in check_output_format(inputs.get('output_format', 'csv')):
+            result.save(inputs._dir + 'result', fmt=fmt)
+        with CustomLogger('logger_interim') as logger_interim:
+            logger_interim.add_file_handler(level='INFO', filename=inputs._dir+'log_interim.txt')
+            logger_interim.get_logger().info(f'Loaded from the result cache; {key}')
+        with CustomLogger('logger_result') as logger_result:
+            logger_result.add_stream_handler(level='INFO')
+            logger_result.add_file_handler(level='INFO', filename=inputs._dir+'log_result.txt')
+            for line in result_log.splitlines():
+                logger_result.get_logger().info(line)
+        return CachedRun(key, result, result_log)
+
+    def store(self, key:str, method, _dir:str) -> None:
+        """
+        계산이 끝난 method의 결과를 저장한다. 파일로 stream한 결과는 저장하지 않는다.
+        """
+        if method.result.is_streaming:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_dir = tempfile.mkdtemp(dir=self.cache_dir, prefix='.tmp_')
+        try:
+            method.result.save(osp.join(tmp_dir, 'result'), fmt='npy')
+            shutil.copyfile(_dir + 'log_result.txt', osp.join(tmp_dir, 'log_result.txt'))
+            os.replace(tmp_dir, self._entry_dir(key)) # atomic. another process may store the same key
+        except OSError:
+            pass
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        self.evict()
+
+    def evict(self) -> None:
+        """
+        cache 크기가 max_bytes보다 작아질 때까지 가장 오래 사용하지 않은 결과를 지운다.
+        """
+        entries = []
+        total = 0
+        for name in os.listdir(self.cache_dir):
+            entry = osp.join(self.cache_dir, name)
+            if name.startswith('.') or not osp.isdir(entry):
+                continue
+            try:
+                size = sum(osp.getsize(osp.join(entry, f)) for f in os.listdir(entry))
+                entries.append((osp.getmtime(entry), size, entry))
+            except OSError:
+                continue
+            total += size
+        for _, size, entry in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
@@ -33,6 +33,13 @@ HOW TO USE
         >>> class Newton_Raphson(Base_Method_Iteration):
         >>>     pass
                 
+   (선택) 모듈을 import하는 시간을 줄이려면 class 대신 모듈 경로를 저장해 두고 build할 때 import
+    예시)
+        [class가 있는 package의 __init__.py]에서
+        @ numerical_method_v2/core/methods/ode/__init__.py
+        >>> from ...builder import METHODS
+        >>> METHODS.store_lazy_module('Newton_Raphson', f'{__name__}.newton_raphson')
+
 4. builder에 ConfigDict를 넣어 실행
     예시)
         [원하는기능을 수행할 파일]에서
@@ -41,6 +48,7 @@ HOW TO USE
 """
 
 from .config import ConfigDict
+from importlib import import_module
 import inspect
 
 def ground_make_from_cfg(cfg: ConfigDict, storage: 'Storage'):
@@ -124,6 +132,7 @@ class Storage:
     def __init__(self, name, ground_making=None, parent=None, category=None):
         self._name = name
         self._module_dict = dict()
+        self._lazy_module_dict = dict()
         self._children = dict()
         self._category = self.infer_category() if category is None else category
         if parent is not None:
@@ -172,6 +181,11 @@ class Storage:
         category, real_key = self.split_category_key(key)
         if category is None or category == self._category:
             # get from self
+            if real_key not in self._module_dict and real_key in self._lazy_module_dict:
+                module_path = self._lazy_module_dict[real_key]
+                import_module(module_path) # the module stores the class by store_module
+                assert real_key in self._module_dict, \
+                    f'{module_path} is imported for "{real_key}", but it does not store "{real_key}" in {self.name}. Check store_lazy_module.'
             if real_key in self._module_dict:
                 return self._module_dict[real_key]
         else:
@@ -203,8 +217,24 @@ class Storage:
         for name in module_name:
             if name in self._module_dict:
                 raise KeyError(f'{name} is already stored in {self.name}')
+            lazy_path = self._lazy_module_dict.get(name, module.__module__)
+            assert lazy_path == module.__module__, \
+                f'"{name}" is stored in {module.__module__}, but store_lazy_module maps it to {lazy_path}.'
             self._module_dict[name] = module
 
+    def store_lazy_module(self, name: str, module_path: str) -> None:
+        """
+        "name"을 처음 get할 때 "module_path" 모듈을 import한다.
+        그 모듈에서 store_module로 "name"을 저장해야 한다. (다른 모듈에서 저장하거나 저장하지 않으면 AssertionError)
+
+        Example:
+            >>> METHODS.store_lazy_module('Newton_Raphson', 'core.methods.ode.newton_raphson')
+            >>> METHODS.get('Newton_Raphson') # core.methods.ode.newton_raphson is imported here
+        """
+        if name in self._module_dict or name in self._lazy_module_dict:
+            raise KeyError(f'{name} is already stored in {self.name}')
+        self._lazy_module_dict[name] = module_path
+
     def store_module(self, name=None, module=None):
         """
         모듈을 self._module_dict에 저장하기. key는 class 이름, value는 그 class.
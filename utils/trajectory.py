@@ -0,0 +1,427 @@
+"""
+HOW TO USE
+
+1. method의 save_init_val_for_csv에서 column 이름으로 TrajectoryBuffer를 만들고 초기값 저장
+    예시)
+        @ numerical_method_v2/core/methods/ode/runge_kutta.py
+        >>> self.result = TrajectoryBuffer(['x', 'y'])
+        >>> self.result.append(0, [init_x, init_y])
+
+2. 매 iteration마다 append로 한 행씩 저장 (amortized O(1))
+        >>> self.result.append(cnt, val)
+
+3. 계산이 끝난 후 한 번만 DataFrame으로 변환하거나 파일로 저장
+        >>> self.df = self.result.to_dataframe()
+        >>> self.result.save(_dir + 'result', fmt='npy') # csv, npy, npz, parquet, feather
+
+   또는 계산 중에 chunk_size 행마다 파일에 쓰기 (메모리는 chunk_size 행만 사용하고, 중단되어도 쓴 만큼은 남는다.)
+        >>> self.result.stream_to(_dir + 'result', ['csv', 'npy'], chunk_size=10000)
+        >>> ...
+        >>> self.result.close()
+
+4. 저장된 결과 읽기 (npy는 memory-mapped로 열려서 전체를 메모리에 읽지 않는다.)
+        >>> result = load_result(_dir + 'result.npy')
+        >>> result['x'], result['index']
+
+5. checkpoint (utils/checkpoint.py 참고)
+        >>> snapshot = self.result.snapshot(_dir + 'checkpoint_result.npy') # 지난 snapshot 이후의 행만 파일에 이어 쓴다.
+        >>> ...
+        >>> self.result.restore(snapshot, _dir + 'checkpoint_result.npy')   # 이어서 계산할 때
+"""
+
+import importlib.util
+import os
+import os.path as osp
+import struct
+import numpy as np
+# pandas is imported only when DataFrame, parquet or feather is needed. (it takes most of the start-up time)
+
+OUTPUT_FORMATS = ('csv', 'npy', 'npz', 'parquet', 'feather')
+STREAM_FORMATS = ('csv', 'npy')
+
+def check_output_format(fmt) -> list:
+    """
+    output format을 확인해서 list로 반환한다. parquet, feather는 pyarrow가 필요하다.
+
+    Args:
+        fmt : str or list of str in OUTPUT_FORMATS
+    """
+    fmts = [fmt] if isinstance(fmt, str) else list(fmt)
+    for f in fmts:
+        if f not in OUTPUT_FORMATS:
+            raise ValueError(f'"output_format" must be in {OUTPUT_FORMATS}, but got {f}')
+        if f in ('parquet', 'feather') and importlib.util.find_spec('pyarrow') is None:
+            raise ImportError(f'"{f}" output needs pyarrow. ($ pip install pyarrow)')
+    return fmts
+
+def load_result(path:str, mmap:bool=True):
+    """
+    TrajectoryBuffer.save로 저장한 결과 파일을 읽는다.
+
+    Args:
+        path : result.csv, result.npy, result.npz, result.parquet, result.feather
+        mmap : npy를 memory-mapped로 열기 (read only)
+
+    Returns:
+        npy : structured ndarray (fields; index, columns...)
+        npz : NpzFile (keys; index, columns...)
+        csv, parquet, feather : pd.DataFrame
+    """
+    ext = osp.splitext(path)[1]
+    if ext == '.npy':
+        return np.load(path, mmap_mode='r' if mmap else None)
+    if ext == '.npz':
+        return np.load(path)
+    import pandas as pd
+    if ext == '.csv':
+        return pd.read_csv(path, index_col=0)
+    if ext == '.parquet':
+        return pd.read_parquet(path)
+    if ext == '.feather':
+        return pd.read_feather(path).set_index('index')
+    raise ValueError(f'Unknown result file; {path}')
+
+class _CsvSink:
+    """
+    행들을 csv 파일 끝에 이어서 쓴다. (pandas의 to_csv와 같은 형식)
+    "size"가 있으면 이미 쓴 파일을 size byte로 자르고 이어 쓴다. (checkpoint에서 이어서 계산할 때)
+    "casts"는 {column 번호: dtype}이다. 그 column은 dtype으로 바꿔서 쓴다. (e.g. 2.0 -> 2, 1.0 -> True)
+    """
+    def __init__(self, path:str, columns:list, size:int=None, casts:dict=None) -> None:
+        self.casts = casts or {}
+        if size is not None:
+            os.truncate(path, size)
+            self.file = open(path, 'a', encoding='utf-8', newline='')
+            return
+        self.file = open(path, 'w', encoding='utf-8', newline='')
+        self.file.write(',' + ','.join(columns) + '\n')
+
+    def write(self, index:np.ndarray, data:np.ndarray) -> None:
+        rows = data.tolist() if not self.casts else \
+               zip(*(data[:, i].astype(self.casts[i]).tolist() if i in self.casts else data[:, i].tolist()
+                     for i in range(data.shape[1])))
+        self.file.write(''.join(f'{i},' + ','.join('' if v != v else repr(v) for v in row) + '\n'
+                                for i, row in zip(index.tolist(), rows)))
+        self.file.flush()
+
+    def size(self) -> int:
+        return os.fstat(self.file.fileno()).st_size
+
+    def close(self) -> None:
+        self.file.close()
+
+class _NpySink:
+    """
+    structured 행들을 npy 파일 끝에 이어서 쓰고 header의 shape을 갱신한다.
+    header의 길이가 변하지 않도록 shape을 고정 폭으로 쓰므로, 쓰는 도중에도 항상 np.load로 읽을 수 있다.
+    "n"이 있으면 이미 쓴 파일을 n 행으로 자르고 이어 쓴다. (checkpoint에서 이어서 계산할 때)
+    """
+    def __init__(self, path:str, dtype, n:int=None) -> None:
+        self.dtype = np.dtype(dtype)
+        self.n = 0 if n is None else n
+        self.file = open(path, 'wb+' if n is None else 'rb+')
+        self._write_header()
+        if n is not None:
+            self.file.truncate(self.file.tell() + n * self.dtype.itemsize)
+
+    def _write_header(self) -> None:
+        # npy format version 2.0; magic string, version, header length (uint32), header
+        header = "{'descr': %r, 'fortran_order': False, 'shape': (%20d,), }" % (np.lib.format.dtype_to_descr(self.dtype), self.n)
+        header += ' ' * ((-(12 + len(header) + 1)) % 64) + '\n' # align data to 64 bytes
+        self.file.seek(0)
+        self.file.write(b'\x93NUMPY\x02\x00' + struct.pack('<I', len(header)) + header.encode('latin1'))
+
+    def write(self, index:np.ndarray, data:np.ndarray) -> None:
+        rows = _to_structured(index, data, self.dtype)
+        self.file.seek(0, 2)
+        self.file.write(rows.tobytes())
+        self.n += rows.shape[0]
+        self._write_header()
+        self.file.flush()
+
+    def size(self) -> int:
+        return self.n
+
+    def close(self) -> None:
+        self.file.close()
+
+def _to_structured(index:np.ndarray, data:np.ndarray, dtype) -> np.ndarray:
+    out = np.empty(index.shape[0], dtype=dtype)
+    out['index'] = index
+    for i, c in enumerate(dtype.names[1:]):
+        out[c] = data[:, i]
+    return out
+
+class TrajectoryBuffer:
+    """
+    미리 할당한 NumPy 배열에 결과를 행 단위로 쌓는 저장소.
+    공간이 부족하면 capacity를 2배로 늘리므로 append는 amortized O(1)이다.
+    (pd.DataFrame.loc[idx] = val은 매번 O(n)이라 전체가 O(n^2)가 된다.)
+    stream_to를 호출하면 capacity를 늘리지 않고 가득 찰 때마다 파일에 쓴다.
+    """
+
+    def __init__(self, columns:list, capacity:int=1024, dtype=np.float64, column_dtypes:dict=None) -> None:
+        """
+        Args:
+            columns : column 이름들. 한 행의 값 개수와 같아야 한다.
+            capacity : 처음에 할당할 행의 개수
+            dtype : 저장할 값의 type
+            column_dtypes : {column 이름: dtype}. 메모리에는 dtype으로 쌓고, 파일과 DataFrame으로 내보낼 때 이 dtype으로 바꾼다.
+                            (e.g. {'iteration': np.int64, 'converged': np.bool_} -> result.csv에 2.0, 1.0 대신 2, True)
+        """
+        assert capacity > 0, '"capacity" should be a positive integer.'
+        self.columns = list(columns)
+        self.column_dtypes = {c: np.dtype(t) for c, t in (column_dtypes or {}).items()}
+        assert set(self.column_dtypes) <= set(self.columns), f'Unknown columns in "column_dtypes"; {set(self.column_dtypes) - set(self.columns)}'
+        self._index = np.empty(capacity, dtype=np.int64)
+        self._data = np.empty((capacity, len(self.columns)), dtype=dtype)
+        self._size = 0
+        self._sinks = []
+        self._stream_paths = []
+        self._n_flushed = 0
+        self._last_row = None
+        self._snapshot_sink = None
+
+    def __len__(self) -> int:
+        return self._n_flushed + self._size
+
+    @classmethod
+    def from_structured(cls, arr:np.ndarray) -> 'TrajectoryBuffer':
+        """
+        to_structured (또는 npy 파일)로 만든 structured ndarray에서 TrajectoryBuffer를 만든다.
+        """
+        columns = list(arr.dtype.names[1:])
+        dtype = arr.dtype[columns[0]] if columns else np.float64
+        buffer = cls(columns, capacity=max(1, arr.shape[0]), dtype=dtype,
+                     column_dtypes={c: arr.dtype[c] for c in columns if arr.dtype[c] != dtype})
+        buffer.extend(arr['index'], np.column_stack([arr[c] for c in columns]) if columns else np.empty((arr.shape[0], 0)))
+        return buffer
+
+    @property
+    def is_streaming(self) -> bool:
+        return bool(self._stream_paths)
+
+    @property
+    def structured_dtype(self) -> np.dtype:
+        return np.dtype([('index', self._index.dtype)] + [(c, self.column_dtypes.get(c, self._data.dtype)) for c in self.columns])
+
+    def _csv_sink(self, path:str, size:int=None) -> _CsvSink:
+        casts = {i: self.column_dtypes[c] for i, c in enumerate(self.columns) if c in self.column_dtypes}
+        return _CsvSink(path, self.columns, size=size, casts=casts)
+
+    def stream_to(self, path:str, fmts:list, chunk_size:int) -> None:
+        """
+        이후에는 chunk_size 행이 쌓일 때마다 파일에 쓴다. 이미 저장된 행도 파일에 쓴다.
+
+        Args:
+            path : 확장자를 뺀 파일 경로. (e.g. _dir + 'result')
+            fmts : list of STREAM_FORMATS
+            chunk_size : 메모리에 두는 최대 행의 개수
+        """
+        assert chunk_size > 0, '"chunk_size" should be a positive integer.'
+        for fmt in fmts:
+            if fmt not in STREAM_FORMATS:
+                raise ValueError(f'Streaming output supports only {STREAM_FORMATS}, but got {fmt}')
+        for fmt in fmts:
+            stream_path = f'{path}.{fmt}'
+            self._sinks.append(self._csv_sink(stream_path) if fmt == 'csv' else _NpySink(stream_path, self.structured_dtype))
+            self._stream_paths.append(stream_path)
+        self._flush()
+        self._index = np.empty(chunk_size, dtype=self._index.dtype)
+        self._data = np.empty((chunk_size, self._data.shape[1]), dtype=self._data.dtype)
+
+    def _flush(self) -> None:
+        """쌓인 행을 파일에 쓰고 비운다."""
+        if self._size == 0:
+            return
+        self._last_row = (self._index[self._size - 1], self._data[self._size - 1].copy())
+        for sink in self._sinks:
+            sink.write(self.index, self.data)
+        self._n_flushed += self._size
+        self._size = 0
+
+    def close(self) -> None:
+        """남은 행을 파일에 쓰고 파일을 닫는다. (stream_to를 호출한 경우)"""
+        self._flush()
+        for sink in self._sinks:
+            sink.close()
+        self._sinks = []
+        self.close_snapshot()
+
+    def snapshot(self, path:str) -> dict:
+        """
+        checkpoint를 위해 지금까지 저장한 행을 파일에 남기고 restore에 필요한 값을 반환한다.
+        지난 snapshot 이후의 행만 path(npy)에 이어 쓰므로 snapshot의 비용은 새 행의 개수에 비례한다.
+        stream_to를 호출한 경우에는 쌓인 행을 stream 파일에 쓰고 파일들의 크기만 기록한다.
+
+        Args:
+            path : snapshot 행을 저장할 npy 파일 경로. (e.g. _dir + 'checkpoint_result.npy')
+        """
+        if self._sinks:
+            self._flush()
+            return dict(n_rows=len(self), chunk_size=self.capacity, last_row=self._last_row,
+                        streams=[(stream_path, sink.size()) for stream_path, sink in zip(self._stream_paths, self._sinks)])
+        if self._snapshot_sink is None:
+            self._snapshot_sink = _NpySink(path, self.structured_dtype)
+        n = self._snapshot_sink.n
+        if n < self._size:
+            self._snapshot_sink.write(self._index[n:self._size], self._data[n:self._size])
+        return dict(n_rows=self._size, chunk_size=None, last_row=None, streams=[])
+
+    def restore(self, snapshot:dict, path:str) -> None:
+        """
+        snapshot 때의 행으로 되돌린다. 그 이후에 저장한 행은 버린다. (파일도 snapshot 때의 크기로 자른다.)
+
+        Args:
+            snapshot : return of snapshot
+            path : snapshot에 사용한 npy 파일 경로
+        """
+        self._size = 0
+        if snapshot['streams']:
+            self._sinks = []
+            self._stream_paths = []
+            for stream_path, size in snapshot['streams']:
+                self._sinks.append(self._csv_sink(stream_path, size=size) if stream_path.endswith('.csv')
+                                   else _NpySink(stream_path, self.structured_dtype, n=size))
+                self._stream_paths.append(stream_path)
+            self._n_flushed = snapshot['n_rows']
+            self._last_row = snapshot['last_row']
+            self._index = np.empty(snapshot['chunk_size'], dtype=self._index.dtype)
+            self._data = np.empty((snapshot['chunk_size'], self._data.shape[1]), dtype=self._data.dtype)
+            return
+        self._snapshot_sink = _NpySink(path, self.structured_dtype, n=snapshot['n_rows'])
+        rows = np.load(path, mmap_mode='r')
+        self.extend(rows['index'], np.column_stack([rows[c] for c in self.columns]))
+        del rows # close the memory map
+
+    def close_snapshot(self) -> None:
+        """snapshot 파일을 닫는다."""
+        if self._snapshot_sink is not None:
+            self._snapshot_sink.close()
+            self._snapshot_sink = None
+
+    def last_row(self) -> dict:
+        """마지막으로 저장한 행을 {'index': ..., column: ...}로 반환한다."""
+        if self._size > 0:
+            idx, row = self._index[self._size - 1], self._data[self._size - 1]
+        elif self._last_row is not None:
+            idx, row = self._last_row
+        else:
+            return {}
+        last = dict(zip(self.columns, row.tolist()))
+        for c, dtype in self.column_dtypes.items():
+            last[c] = np.asarray(last[c]).astype(dtype).item()
+        return {'index': int(idx), **last}
+
+    @property
+    def capacity(self) -> int:
+        return self._index.shape[0]
+
+    @property
+    def index(self) -> np.ndarray:
+        return self._index[:self._size]
+
+    @property
+    def data(self) -> np.ndarray:
+        return self._data[:self._size]
+
+    def _grow(self) -> None:
+        """capacity를 2배로 늘리고 기존 값을 복사한다."""
+        capacity = 2 * self.capacity
+        index = np.empty(capacity, dtype=self._index.dtype)
+        data = np.empty((capacity, self._data.shape[1]), dtype=self._data.dtype)
+        index[:self._size] = self._index[:self._size]
+        data[:self._size] = self._data[:self._size]
+        self._index, self._data = index, data
+
+    def append(self, idx:int, val) -> None:
+        """
+        한 행을 저장한다.
+
+        Args:
+            idx : DataFrame의 index가 될 값
+            val : scalar 또는 column 개수만큼의 값을 가진 sequence
+        """
+        if self._size == self.capacity:
+            if self._sinks:
+                self._flush()
+            else:
+                self._grow()
+        self._index[self._size] = idx
+        self._data[self._size] = val
+        self._size += 1
+
+    def extend(self, idx, vals) -> None:
+        """
+        여러 행을 한 번에 저장한다.
+
+        Args:
+            idx : 1차원 index 배열
+            vals : (len(idx), column 개수) 모양의 값
+        """
+        idx = np.asarray(idx)
+        vals = np.broadcast_to(vals, (idx.shape[0], self._data.shape[1]))
+        if not self._sinks:
+            while self._size + idx.shape[0] > self.capacity:
+                self._grow()
+        start = 0
+        while start < idx.shape[0]:
+            if self._size == self.capacity:
+                self._flush()
+            n = min(self.capacity - self._size, idx.shape[0] - start)
+            self._index[self._size:self._size+n] = idx[start:start+n]
+            self._data[self._size:self._size+n] = vals[start:start+n]
+            self._size += n
+            start += n
+
+    def to_dataframe(self) -> 'pd.DataFrame':
+        import pandas as pd
+        if self.is_streaming: # read back the written file
+            path = self._stream_paths[0]
+            if path.endswith('.npy'):
+                return pd.DataFrame(load_result(path, mmap=False)).set_index('index').rename_axis(None)
+            return load_result(path)
+        df = pd.DataFrame(self.data, index=self.index, columns=self.columns)
+        return df.astype(self.column_dtypes) if self.column_dtypes else df
+
+    def to_csv(self, path:str) -> None:
+        """pandas의 to_csv와 같은 형식으로 저장한다. (pandas를 import하지 않는다.)"""
+        sink = self._csv_sink(path)
+        sink.write(self.index, self.data)
+        sink.close()
+
+    def to_structured(self) -> np.ndarray:
+        """
+        index와 column 이름을 field로 가진 structured ndarray로 변환한다.
+        """
+        return _to_structured(self.index, self.data, self.structured_dtype)
+
+    def save(self, path:str, fmt:str='csv') -> str:
+        """
+        결과를 파일로 저장한다.
+
+        Args:
+            path : 확장자를 뺀 파일 경로. (e.g. _dir + 'result')
+            fmt : OUTPUT_FORMATS 중 하나
+                npy     : structured ndarray. np.load(mmap_mode='r')로 열 수 있다.
+                npz     : column마다 ndarray
+                parquet, feather : pyarrow가 필요하다.
+
+        Returns:
+            저장한 파일 경로
+        """
+        path = f'{path}.{fmt}'
+        if fmt == 'csv':
+            self.to_csv(path)
+        elif fmt == 'npy':
+            np.save(path, self.to_structured())
+        elif fmt == 'npz':
+            np.savez(path, index=self.index, **{c: self._data[:self._size, i].astype(self.column_dtypes.get(c, self._data.dtype))
+                                                for i, c in enumerate(self.columns)})
+        elif fmt == 'parquet':
+            self.to_dataframe().to_parquet(path)
+        elif fmt == 'feather':
+            self.to_dataframe().rename_axis('index').reset_index().to_feather(path)
+        else:
+            raise ValueError(f'"fmt" must be in {OUTPUT_FORMATS}, but got {fmt}')
+        return path